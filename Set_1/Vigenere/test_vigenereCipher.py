@@ -0,0 +1,59 @@
+import random
+
+import vigenereCipher
+
+# Non-ASCII symbols mixed in the random messages: the special lowercase letters, their
+# uppercase forms, accented letters and symbols that are never translated
+NON_ASCII = 'ıſﬅﬆİßÀàéÉ€ñ漢字🙂'
+
+
+def randomMessage(rng, length, alphabet):
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def randomKey(rng):
+    return ''.join(rng.choice(vigenereCipher.LETTERS + vigenereCipher.LETTERS.lower())
+                   for _ in range(rng.randint(1, 12)))
+
+
+def test_engines_identical_ascii():
+    rng = random.Random(0)
+    alphabet = ''.join(chr(code) for code in range(128))
+    for _ in range(200):
+        key, message = randomKey(rng), randomMessage(rng, rng.randint(0, 300), alphabet)
+        for mode in ('encrypt', 'decrypt'):
+            assert (vigenereCipher.translateMessageNumpy(key, message, mode)
+                    == vigenereCipher.translateMessage(key, message, mode))
+
+
+def test_engines_identical_non_ascii():
+    rng = random.Random(1)
+    alphabet = 'abcXYZ .,\n' + NON_ASCII
+    for _ in range(200):
+        key, message = randomKey(rng), randomMessage(rng, rng.randint(0, 300), alphabet)
+        for mode in ('encrypt', 'decrypt'):
+            assert (vigenereCipher.translateMessageNumpy(key, message, mode)
+                    == vigenereCipher.translateMessage(key, message, mode))
+
+
+def test_engines_identical_special_lower():
+    for code in vigenereCipher.SPECIAL_LOWER:
+        message = 'a%sb' % chr(code)
+        assert (vigenereCipher.encryptMessage('KEY', message, engine='numpy')
+                == vigenereCipher.encryptMessage('KEY', message))
+    assert vigenereCipher.encryptMessage('KEY', 'aﬅb', engine='numpy') == 'kwz'
+
+
+def test_stream_matches_message():
+    rng = random.Random(2)
+    alphabet = 'abcXYZ .,\n' + NON_ASCII
+    for engine in vigenereCipher.ENGINES:
+        for _ in range(50):
+            key, message = randomKey(rng), randomMessage(rng, rng.randint(0, 300), alphabet)
+            cuts = sorted(rng.sample(range(len(message) + 1), min(5, len(message) + 1)))
+            chunks = [message[i:j] for i, j in zip([0] + cuts, cuts + [len(message)])]
+            streamed = ''.join(vigenereCipher.translateStream(key, chunks, 'encrypt', engine))
+            assert streamed == vigenereCipher.encryptMessage(key, message)
+    message = 'aﬅb' * 3
+    assert ''.join(vigenereCipher.translateStream('KEY', list(message), 'encrypt')) == \
+        vigenereCipher.encryptMessage('KEY', message)
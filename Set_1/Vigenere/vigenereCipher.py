@@ -1,15 +1,32 @@
 # Vigenere cipher that uses more than set of substitutions. Immune to brute-force
 # given strong enough key selection"""
 
+import io
+import re
+
+import numpy as np
+
 LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
 
+# Non-ASCII lowercase symbols whose upper() is found in LETTERS ('ı' -> 'I',
+# 'ſ' -> 'S', and the ligatures 'ﬅ', 'ﬆ' -> 'ST', found at 'S'): translateMessage
+# treats them as lowercase letters. These are all such code points
+SPECIAL_LOWER = {ord('ı'): LETTERS.find('I'), ord('ſ'): LETTERS.find('S'),
+                 ord('ﬅ'): LETTERS.find('ST'), ord('ﬆ'): LETTERS.find('ST')}
+
+# Symbols that consume a key letter, used to carry the key index across chunks
+LETTERS_PATTERN = re.compile('[A-Za-z%s]' % ''.join(chr(code) for code in SPECIAL_LOWER))
+
+# Default size (in characters) of the buffers read by the streaming functions
+CHUNK_SIZE = 1 << 20
 
-def encryptMessage(key, message):
-    return translateMessage(key, message, 'encrypt')
 
+def encryptMessage(key, message, engine='python'):
+    return ENGINES[engine](key, message, 'encrypt')
 
-def decryptMessage(key, message):
-    return translateMessage(key, message, 'decrypt')
+
+def decryptMessage(key, message, engine='python'):
+    return ENGINES[engine](key, message, 'decrypt')
 
 
 def translateMessage(key, message, mode):
@@ -40,4 +57,100 @@ def translateMessage(key, message, mode):
             # Append the symbol without encrypting/decrypting.
             translated.append(symbol)
 
-    return ''.join(translated)
\ No newline at end of file
+    return ''.join(translated)
+
+
+def translateMessageNumpy(key, message, mode):
+    # Same result of translateMessage, but the message is mapped to an array of
+    # character codes once and every letter is shifted in a single vectorized pass
+    if message.isascii():
+        codes = np.frombuffer(message.encode('ascii'), dtype=np.uint8)
+        encoding = 'ascii'
+    else:
+        codes = np.frombuffer(message.encode('utf-32-le'), dtype=np.uint32)
+        encoding = 'utf-32-le'
+
+    isUpper = (codes >= ord('A')) & (codes <= ord('Z'))
+    isLower = (codes >= ord('a')) & (codes <= ord('z'))
+
+    nums = np.full(codes.shape, -1, dtype=np.int64)
+    nums[isUpper] = codes[isUpper] - ord('A')
+    nums[isLower] = codes[isLower] - ord('a')
+    for code, num in SPECIAL_LOWER.items():
+        isSpecial = codes == code
+        nums[isSpecial] = num
+        isLower |= isSpecial
+
+    isLetter = nums != -1
+    letterCount = np.count_nonzero(isLetter)
+    if letterCount == 0:
+        return message
+
+    # Key shifts tiled over the letters only, non-letters don't consume the key
+    key = key.upper()
+    if len(key) == 0:
+        raise IndexError('string index out of range')
+    keyShifts = np.array([LETTERS.find(k) for k in key], dtype=np.int64)
+    shifts = np.resize(keyShifts, letterCount)
+
+    letters = nums[isLetter]
+    if mode == 'encrypt':
+        letters += shifts
+    elif mode == 'decrypt':
+        letters -= shifts
+    letters %= len(LETTERS)
+
+    translated = codes.copy()
+    translated[isLetter] = letters + np.where(isUpper[isLetter], ord('A'), ord('a'))
+    return translated.tobytes().decode(encoding)
+
+
+# Engines available for encryptMessage and decryptMessage
+ENGINES = {'python': translateMessage, 'numpy': translateMessageNumpy}
+
+
+def countLetters(chunk):
+    # Number of symbols of chunk that are translated (and move the key index)
+    return len(chunk) - len(LETTERS_PATTERN.sub('', chunk))
+
+
+def translateStream(key, chunks, mode, engine='python'):
+    # Translate an iterable of string chunks yielding one translated chunk for each
+    # of them. The key index is carried across the chunk boundaries, so joining the
+    # output gives the same result of translateMessage on the joined input
+    key = key.upper()
+    keyIndex = 0
+    for chunk in chunks:
+        rotatedKey = key[keyIndex:] + key[:keyIndex]
+        yield ENGINES[engine](rotatedKey, chunk, mode)
+        if len(key) != 0:
+            keyIndex = (keyIndex + countLetters(chunk)) % len(key)
+
+
+def readChunks(stream, chunkSize=CHUNK_SIZE, encoding='utf-8'):
+    # Read a text or byte stream in fixed-size chunks, byte streams are decoded
+    # incrementally so multi-byte characters split between two reads are kept
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        stream = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    while True:
+        chunk = stream.read(chunkSize)
+        if not chunk:
+            break
+        yield chunk
+
+
+def translateFile(key, inputPath, outputPath, mode, chunkSize=CHUNK_SIZE, engine='python', encoding='utf-8'):
+    # Translate the file inputPath into outputPath holding at most chunkSize
+    # characters in memory, regardless of the size of the file
+    with open(inputPath, 'r', encoding=encoding, newline='') as inputFile, \
+            open(outputPath, 'w', encoding=encoding, newline='') as outputFile:
+        for translated in translateStream(key, readChunks(inputFile, chunkSize), mode, engine):
+            outputFile.write(translated)
+
+
+def encryptFile(key, inputPath, outputPath, chunkSize=CHUNK_SIZE, engine='python'):
+    translateFile(key, inputPath, outputPath, 'encrypt', chunkSize, engine)
+
+
+def decryptFile(key, inputPath, outputPath, chunkSize=CHUNK_SIZE, engine='python'):
+    translateFile(key, inputPath, outputPath, 'decrypt', chunkSize, engine)
@@ -1,75 +1,214 @@
-import pyperclip
+import argparse
+import json
+import math
+import os
 import re
-from functools import reduce
-from math import gcd
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from string import ascii_uppercase
 
 import numpy as np
 
+import text_frequency
 from Vigenere import vigenereCipher
 
 LETTERS = [letter for letter in ascii_uppercase]
 
 # If set to True, program doesn't print anything
+SILENT_MODE = False
+
 NON_LETTERS_PATTERN = re.compile('[^A-Z]')
 
+# Minimum number of ciphertext letters per key element: keys longer than the number of letters
+# divided by this are not attempted, their substrings are too short for the statistics
+MIN_LETTERS_PER_KEY_ELEMENT = 20
+
+# Fraction of the most common spacing factor count a factor needs to be a key length candidate
+KASISKI_THRESHOLD = 0.7
+
+# Fraction of the index of coincidence of a key length its divisors need to be ranked in its place
+IC_DIVISOR_THRESHOLD = 0.9
+
+# Number of key lengths attempted by hackVigenere
+NUM_KEY_LENGTH_CANDIDATES = 4
+
+# Plaintext fitness (see englishFitness) above which hackVigenere stops attempting key lengths,
+# english text scores about 0.065 while uniformly random letters score 1/26 = 0.038
+FITNESS_THRESHOLD = 0.055
+
+# letter frequency in the english dictionary, see setReferenceDistribution
+EN_LETTER_FREQ = list(text_frequency.reference_distribution().values())
+
+# Number of ciphertexts submitted to the process pool and not yet written, for each worker
+QUEUE_SIZE_PER_WORKER = 4
+
 
 def main():
+    parser = argparse.ArgumentParser(description='Break Vigenere ciphertexts.')
+    parser.add_argument('input', nargs='?',
+                        help='file with one ciphertext per line or directory of .txt ciphertexts (batch mode)')
+    parser.add_argument('-o', '--output', help='JSONL file of the batch results (default: standard output)')
+    parser.add_argument('-w', '--workers', type=int, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('-r', '--reference', help='frequency table (see text_frequency) of the reference letter '
+                                                  'distribution (default: english letter frequency)')
+    parser.add_argument('-c', '--clipboard', action='store_true', help='copy the hacked message to the clipboard')
+    args = parser.parse_args()
+    setReferenceDistribution(args.reference)
+
+    if args.input is not None:
+        hackBatch(args.input, args.output, args.workers, args.reference)
+        return
+
     cipherText = "PNHEUAAMRMSLYZPSKWAUGAICLLMEDMDEGAEYAEZOWSEIGBWZUTJTYYFWRLEHFWFWRJWIAZLPYMMYPMGRFXPQHVOWVIZOJMLPZMLRVCHIYMMXLALNUUQWRKIXPVOFLJAFGAIHHGEHVEAOQVMEPHPNCCBEYEIEPMCWRQETENGVKWHNRLPDVXHJLAZFTMGRFXRZABSAKRTEEXAZBTOBVKGCURSFJWFLUBAUAEIDZGZUNCDEZBROLLEOJRQPUXVZPKLLCWUNGAIHHGSEJYUDUHTPMCWLPUQMVZLEJIECYQAMRUSOFBSEJMXDVXVDHQOAEYESNLWTUEPRVYXWNRWZUBSECMAKBNXQVZEHVQQCBGWAPZLTFPEYBNOYVEUUJRMSPBXTGMYRFZQSCBICYMEECJEUFGSHOMSEJGFAGXHEBZYEURAHVLGZSTPAXSQTERMYNBZRVKQMOXVHOIEHVUMSFNTAVAPDKMEALHLJLANAEUQOSYICFWFAECECBKXNPBTZVLPECNXJAWLPCYOEBYKCLIEEIQMFRMCEOMRRRTQCNFMWSMDAZBFHRZVLCM"
     hackedMessage = hackVigenere(cipherText)
 
     if hackedMessage is not None:
-        print('Copying hacked message to clipboard...')
         print(hackedMessage)
-        pyperclip.copy(hackedMessage)
+        if args.clipboard:
+            # Imported here so that the batch workers never need a clipboard
+            import pyperclip
+            print('Copying hacked message to clipboard...')
+            pyperclip.copy(hackedMessage)
     else:
         print('Failed to break encryption...')
 
 
-def generateTriple(message):
-    length = len(message) - 2
-    return iter([message[i:i + 3] for i in range(length) if i < length])
-
-
-def findRepeatSequenceSpacings(message):
-    # Goes through the message and finds any 3 letter sequences
+def readCiphertexts(path):
+    # Yields (id, ciphertext) pairs: one for each non-empty line of a file, or one
+    # for each .txt file of a directory
+    if os.path.isdir(path):
+        for fileName in sorted(os.listdir(path)):
+            if fileName.endswith('.txt'):
+                with open(os.path.join(path, fileName)) as file:
+                    yield fileName, file.read()
+    else:
+        with open(path) as file:
+            for lineNumber, line in enumerate(file, 1):
+                if line.strip():
+                    yield '%s:%d' % (os.path.basename(path), lineNumber), line.strip()
+
+
+def setReferenceDistribution(tablePath=None):
+    # Use the letter distribution of a frequency table file instead of the english one
+    global EN_LETTER_FREQ
+    EN_LETTER_FREQ = list(text_frequency.reference_distribution(tablePath).values())
+
+
+def initWorker(referenceTablePath=None):
+    # Process pool initializer, batch workers don't print anything
+    global SILENT_MODE
+    SILENT_MODE = True
+    setReferenceDistribution(referenceTablePath)
+
+
+def hackRecord(item):
+    # Break one (id, ciphertext) pair, returns the JSON serializable result
+    ciphertextId, ciphertext = item
+    start = time.perf_counter()
+    hackedMessage, key, fitness = crackVigenere(ciphertext)
+    end = time.perf_counter()
+    return {'id': ciphertextId, 'key': key, 'keyLength': len(key) if key else 0, 'score': fitness,
+            'seconds': end - start, 'plaintext': hackedMessage}
+
+
+def hackBatch(inputPath, outputPath=None, workers=None, referenceTablePath=None):
+    # Break every ciphertext of inputPath (see readCiphertexts) across a process
+    # pool and write one JSON line per ciphertext to outputPath, in completion order.
+    # At most QUEUE_SIZE_PER_WORKER ciphertexts per worker are read ahead
+    workers = workers or os.cpu_count() or 1
+    maxPending = workers * QUEUE_SIZE_PER_WORKER
+    output = open(outputPath, 'w') if outputPath is not None else None
+
+    def writeResults(done):
+        for future in done:
+            line = json.dumps(future.result())
+            if output is not None:
+                output.write(line + '\n')
+            else:
+                print(line, flush=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initWorker,
+                                 initargs=(referenceTablePath,)) as executor:
+            pending = set()
+            for item in readCiphertexts(inputPath):
+                if len(pending) >= maxPending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    writeResults(done)
+                pending.add(executor.submit(hackRecord, item))
+            writeResults(wait(pending).done)
+    finally:
+        if output is not None:
+            output.close()
+
+
+def findRepeatSequenceSpacings(message, minSeqLen=3, maxSeqLen=5):
+    # Goes through the message and finds any 3 to 5 letter sequences
     # that are repeated. Returns a dict with the keys of the sequence and
     # values of a list of spacings (num of letters between the repeats).
 
     # Use a regular expression to remove non-letters from the message:
     message = NON_LETTERS_PATTERN.sub('', message.upper())
-    # Compile a list of seqLen-letter sequences found in the message
-    # keys = sequences, values = list of in spacings
+    codes = np.frombuffer(message.encode('ascii'), dtype=np.uint8).astype(np.int64) - ord('A')
+
+    seqSpacings = {}
+    for seqLen in range(minSeqLen, maxSeqLen + 1):
+        seqCount = len(codes) - seqLen + 1
+        if seqCount < 2:
+            break
+
+        # Rolling base-26 hash of every seqLen-letter sequence. It is exact
+        # (no collisions), equal sequences have equal hashes
+        hashes = np.zeros(seqCount, dtype=np.int64)
+        for j in range(seqLen):
+            hashes = hashes * len(LETTERS) + codes[j:j + seqCount]
+
+        # Sort the positions by hash: the occurrences of a sequence become adjacent
+        # and, being the sort stable, ordered by position
+        positions = np.argsort(hashes, kind='stable')
+        sortedHashes = hashes[positions]
+        isRepeat = sortedHashes[1:] == sortedHashes[:-1]
+        starts = positions[:-1][isRepeat]
+        ends = positions[1:][isRepeat]
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            seqSpacings.setdefault(message[start:start + seqLen], []).append(end - start)
 
-    triple = generateTriple(message)
-
-    dic = {}
-    for i in range(len(message) - 2):
-        tri = next(triple)
-        dic[tri] = message.count(tri)
+    return seqSpacings
 
-    max_val = max(dic, key=dic.get)
 
-    triple = generateTriple(message)
+def getMaxKeyLength(letterCount):
+    # Longest key length worth attempting on a ciphertext of letterCount letters
+    return max(letterCount // MIN_LETTERS_PER_KEY_ELEMENT, 1)
 
-    seqSpacings = []
-    value = first = 0
 
-    for i in range(len(message) - 2):
-        if max_val == next(triple):
-            if first > 0:
-                seqSpacings.append(i - value)
-            if first == 0:
-                value = i
-                first = 1
-
-    return seqSpacings
+def getSpacingFactorCounts(seqSpacings, maxKeyLength):
+    # Returns a dict with the factors from 2 to maxKeyLength as keys and the
+    # number of spacings that are multiple of the factor as values. No factor
+    # larger than the largest spacing can divide any of them.
+    # The spacings are counted once by value, then the multiples of a factor f
+    # are hist[f], hist[2f], ...: O(S log S) in total for spacings up to S
+    spacings = np.array([spacing for spacings in seqSpacings.values() for spacing in spacings], dtype=np.int64)
+    if len(spacings) == 0:
+        return {factor: 0 for factor in range(2, maxKeyLength + 1)}
+    maxKeyLength = min(maxKeyLength, int(spacings.max()))
+    hist = np.bincount(spacings)
+    return {factor: int(hist[factor::factor].sum()) for factor in range(2, maxKeyLength + 1)}
 
 
 def kasiskiExamination(ciphertext):
     # Find sequences of 3 to 5 chars that appear multiple times
     repeatedSeqSpacings = findRepeatSequenceSpacings(ciphertext)
-    return reduce(gcd, repeatedSeqSpacings)
+    maxKeyLength = getMaxKeyLength(len(getLetterCodes(ciphertext)))
+    factorCounts = getSpacingFactorCounts(repeatedSeqSpacings, maxKeyLength)
+
+    # The divisors of the key length divide the same spacings of the key length,
+    # so the most likely key length is the largest factor that divides about
+    # as many spacings as the most common one
+    maxCount = max(factorCounts.values(), default=0)
+    if maxCount == 0:
+        return 1
+    return max(factor for factor, count in factorCounts.items() if count >= KASISKI_THRESHOLD * maxCount)
 
 
 def shiftEncryption(string, k):
@@ -90,22 +229,15 @@ def computeLetterFrequencies(string):
 
 
 def findKeyElement(substring):
-    # After substring have been shifted of k index, do the dot product of enLetterFreq
+    # After substring have been shifted of k index, do the dot product of EN_LETTER_FREQ
     # and the computed frequencies of the shifted substring
-    # letter frequency in the english dictionary
-    enLetterFreq = [0.08167, 0.01492, 0.02782, 0.04253, 0.12702,
-                    0.02228, 0.02015, 0.06094, 0.06966, 0.00153,
-                    0.00772, 0.04025, 0.02406, 0.06749, 0.07507,
-                    0.01929, 0.00095, 0.05987, 0.06327, 0.09056,
-                    0.02758, 0.00978, 0.02360, 0.00150, 0.01974, 0.00074]
-
     maxDotProd = 0
     maxKey = None
 
     for letter in LETTERS:
         letterValue = LETTERS.index(letter)
         shiftedSubString = shiftEncryption(substring, letterValue)
-        dotProd = np.dot(computeLetterFrequencies(shiftedSubString), enLetterFreq)
+        dotProd = np.dot(computeLetterFrequencies(shiftedSubString), EN_LETTER_FREQ)
         if dotProd > maxDotProd:
             maxDotProd = dotProd
             maxKey = letter
@@ -113,24 +245,45 @@ def findKeyElement(substring):
     return maxKey
 
 
-def attemptHackWithKeyLength(ciphertext, mostLikelyKeyLength):
-    # Determine the most likely letters for each letter in the key:
-    ciphertextUp = ciphertext.upper()
+def findKeyElements(letterCounts):
+    # Same result of findKeyElement for every row of a letter count matrix (see
+    # getLetterCountMatrix) at once. Shifting a substring of k positions rotates its
+    # letter counts, so the 26 dot products of each row are the product of the
+    # circulant matrix of the row counts and EN_LETTER_FREQ
+    shifts = np.arange(len(LETTERS))
+    circulantIndex = (shifts[:, np.newaxis] + shifts[np.newaxis, :]) % len(LETTERS)
+    dotProds = letterCounts[:, circulantIndex] @ np.array(EN_LETTER_FREQ)
+
+    # argmax keeps the first maximum as the strict comparison in findKeyElement
+    maxKeys = np.argmax(dotProds, axis=1)
+    return [LETTERS[k] if dotProds[i, k] > 0 else None for i, k in enumerate(maxKeys.tolist())]
+
 
-    substrings = getSubstings(ciphertext, mostLikelyKeyLength)
+def findPossibleKey(ciphertext, mostLikelyKeyLength):
+    # Determine the most likely letters for each letter in the key:
+    letterCounts = getLetterCountMatrix(getLetterCodes(ciphertext), mostLikelyKeyLength)
 
     possibleKey = ""
-    for i in range(len(substrings)):
-        possibleKey += str(findKeyElement(substrings[i]))
+    for keyElement in findKeyElements(letterCounts):
+        possibleKey += str(keyElement)
+    return possibleKey
+
 
-    decryptedText = vigenereCipher.decryptMessage(possibleKey, ciphertextUp)
-    print('Possible encryption hack with key %s: ' % possibleKey)
-    print(decryptedText[:200])
-    print()
+def decryptWithPossibleKey(ciphertext, possibleKey):
+    decryptedText = vigenereCipher.decryptMessage(possibleKey, ciphertext.upper())
+    if not SILENT_MODE:
+        print('Possible encryption hack with key %s: ' % possibleKey)
+        print(decryptedText[:200])
+        print()
 
     return decryptedText
 
 
+def attemptHackWithKeyLength(ciphertext, mostLikelyKeyLength):
+    possibleKey = findPossibleKey(ciphertext, mostLikelyKeyLength)
+    return decryptWithPossibleKey(ciphertext, possibleKey)
+
+
 def getSubstings(ciphertext, mostLikelyKeyLength):
     substrings = []
     for i in range(0, mostLikelyKeyLength):
@@ -141,16 +294,118 @@ def getSubstings(ciphertext, mostLikelyKeyLength):
     return substrings
 
 
-def hackVigenere(ciphertext):
+def getLetterCodes(ciphertext):
+    # Letters of ciphertext as an array of values from 0 to 25
+    ciphertext = NON_LETTERS_PATTERN.sub('', ciphertext.upper())
+    return np.frombuffer(ciphertext.encode('ascii'), dtype=np.uint8).astype(np.int64) - ord('A')
+
+
+def getLetterCountMatrix(codes, keyLength):
+    # Returns a keyLength x 26 matrix, row i counts the letters of the i-th
+    # substring of getSubstings (the letters at positions i, i+keyLength, ...)
+    columns = np.arange(len(codes)) % keyLength
+    counts = np.bincount(columns * len(LETTERS) + codes, minlength=keyLength * len(LETTERS))
+    return counts.reshape(keyLength, len(LETTERS))
+
+
+def indexOfCoincidence(letterCounts):
+    # Index of coincidence of every row of a letter count matrix
+    totals = letterCounts.sum(axis=1)
+    pairs = (letterCounts * (letterCounts - 1)).sum(axis=1)
+    return pairs / np.maximum(totals * (totals - 1), 1)
+
+
+def getCoincidenceCounts(codes):
+    # coincidences[k] is the number of positions i with codes[i] == codes[i + k],
+    # the autocorrelation of the indicator of every letter summed over the
+    # letters, computed for all the shifts at once with one FFT per letter
+    size = 1 << max(2 * len(codes) - 1, 1).bit_length()
+    spectrum = np.zeros(size // 2 + 1)
+    for letter in range(len(LETTERS)):
+        transform = np.fft.rfft((codes == letter).astype(np.float64), size)
+        spectrum += transform.real ** 2 + transform.imag ** 2
+    return np.rint(np.fft.irfft(spectrum, size)[:len(codes)]).astype(np.int64)
+
+
+def getDivisors(n):
+    # Divisors of n in increasing order
+    small = [d for d in range(1, math.isqrt(n) + 1) if n % d == 0]
+    return small + [n // d for d in reversed(small) if d * d != n]
+
+
+def rankKeyLengths(ciphertext, maxKeyLength=None, topK=NUM_KEY_LENGTH_CANDIDATES):
+    # Score every key length up to maxKeyLength (by default the same bound of
+    # kasiskiExamination) by the index of coincidence of its substrings: with
+    # the right key length every substring is a shifted english text, with a
+    # wrong one it looks like random letters.
+    # Two letters are in the same substring when their distance is a multiple of
+    # the key length, so the coinciding pairs of all the substrings are the sum
+    # of the coincidence counts at the multiples of the key length: every key
+    # length costs len(codes) / keyLength, O(n log n) in total.
+    # Returns the topK key lengths, best first, with their scores
+    codes = getLetterCodes(ciphertext)
+    if maxKeyLength is None:
+        maxKeyLength = getMaxKeyLength(len(codes))
+    coincidences = getCoincidenceCounts(codes)
+    scores = {}
+    for keyLength in range(1, min(maxKeyLength, max(len(codes) // 2, 1)) + 1):
+        # Ordered pairs of letters of the same substring, substrings are
+        # len(codes) // keyLength letters long, the first (len(codes) % keyLength) one more
+        size, longer = divmod(len(codes), keyLength)
+        pairs = longer * (size + 1) * size + (keyLength - longer) * size * (size - 1)
+        scores[keyLength] = 2 * int(coincidences[keyLength::keyLength].sum()) / max(pairs, 1)
+
+    # The multiples of the key length score as well as the key length itself:
+    # every key length is replaced by its smallest divisor scoring about as well
+    ranked = []
+    for keyLength, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+        divisor = next(d for d in getDivisors(keyLength) if scores[d] >= IC_DIVISOR_THRESHOLD * score)
+        if divisor not in [length for length, _ in ranked]:
+            ranked.append((divisor, scores[divisor]))
+        if len(ranked) == topK:
+            break
+    return ranked
+
+
+def englishFitness(text):
+    # Dot product of the letter distribution of text and EN_LETTER_FREQ
+    codes = getLetterCodes(text)
+    if len(codes) == 0:
+        return 0.0
+    return float(np.dot(np.bincount(codes, minlength=len(LETTERS)), EN_LETTER_FREQ)) / len(codes)
+
+
+def crackVigenere(ciphertext):
     # First, we need to do Kasiski Examination to figure out what the
     # length of the ciphertext's encryption key is:
     keyLength = kasiskiExamination(ciphertext)
-    print('Kasiski Examination results say the most likely key length are: ', keyLength)
+    if not SILENT_MODE:
+        print('Kasiski Examination results say the most likely key length are: ', keyLength)
+
+    # Then the key lengths ranked by index of coincidence are attempted
+    # in order, until the decrypted text looks like english
+    rankedKeyLengths = [length for length, _ in rankKeyLengths(ciphertext) if length != keyLength]
+    if not SILENT_MODE:
+        print('Index of coincidence results say the next most likely key lengths are: ', rankedKeyLengths)
+
+    # Returns the hacked message, its key and its fitness
+    hackedMessage, hackedKey, bestFitness = None, None, 0.0
+    for keyLength in [keyLength] + rankedKeyLengths:
+        if not SILENT_MODE:
+            print('Attempting hack with key length %s...' % keyLength)
+        possibleKey = findPossibleKey(ciphertext, keyLength)
+        decryptedText = decryptWithPossibleKey(ciphertext, possibleKey)
+        fitness = englishFitness(decryptedText)
+        if fitness > bestFitness:
+            hackedMessage, hackedKey, bestFitness = decryptedText, possibleKey, fitness
+        if fitness >= FITNESS_THRESHOLD:
+            break
+
+    return hackedMessage, hackedKey, bestFitness
 
-    print('Attempting hack with key length %s...' % keyLength)
-    hackedMessage = attemptHackWithKeyLength(ciphertext, keyLength)
 
-    return hackedMessage
+def hackVigenere(ciphertext):
+    return crackVigenere(ciphertext)[0]
 
 
 # If ran instead of imported
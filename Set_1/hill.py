@@ -1,8 +1,7 @@
+import functools
 import math
-import random
 
 import numpy as np
-from collections import OrderedDict
 
 # dictionary for keyboard characters
 alphabet = '0213456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~ \t\x0b2'
@@ -23,30 +22,84 @@ def cipher_operation(operation_type, message):
 
 def inverse_matrix(inputMatrix, modulo):
     # Inverted modulus matrix subroutine
-    a = inputMatrix
-    m = modulo
-    p = np.round(np.linalg.det(a) * np.linalg.inv(a))
-    a = np.round(np.linalg.det(a))
-    num = np.arange(1, m + 1)  # creates a modulo dictionary
-    res = np.mod(a * num, m)
-    b = np.where(res == 1)
-    err = np.size(b)
-    if err == 0:
+    inverse = mod_inverse_matrix(np.asarray(inputMatrix, dtype=np.int64).tolist(), modulo)
+    if inverse is None:
         print("The matrix has no modular inverse")
         return 0
-    b = b[0].item(0) + 1
-    return np.mod(b * p, m).astype(int)
+    return np.array(inverse, dtype=int)
+
+
+def mod_inverse_matrix(a, m):
+    # Exact Gauss-Jordan inversion over the integers mod m, returns None if a is not invertible
+    n = len(a)
+    rows = np.hstack([np.mod(np.array(a, dtype=mod_dtype(m)), m), np.eye(n, dtype=mod_dtype(m))])
+    if mod_row_reduce(rows, n, m) is not None:
+        return None
+    return tuple(tuple(int(x) for x in row[n:]) for row in rows)
+
+
+def mod_dtype(m):
+    # int64 while the products of two numbers mod m fit in it, exact python integers otherwise
+    return np.int64 if (m - 1) ** 2 < 2 ** 63 else object
+
+
+def mod_row_reduce(rows, n, m):
+    # Gauss-Jordan elimination mod m, in place, of the first n columns of the integer matrix rows:
+    # on success the first n rows start with the identity and the other rows with zeros.
+    # Returns the first column without an invertible pivot, or None if every column has one.
+    # If no row has a unit in the column, the pivot is built with euclidean row operations,
+    # so m doesn't need to be prime
+    is_unit = np.frompyfunc(lambda x: math.gcd(int(x), m) == 1, 1, 1)
+    for col in range(n):
+        if col >= np.size(rows, 0):
+            return col
+        units = np.flatnonzero(is_unit(rows[col:, col]).astype(bool))
+        if len(units) != 0:
+            pivot_row = col + units[0]
+        else:
+            nonzero = col + np.flatnonzero(rows[col:, col])
+            while len(nonzero) > 1:
+                pivot_row = nonzero[np.argmin(rows[nonzero, col])]
+                others = nonzero[nonzero != pivot_row]
+                quotients = rows[others, col] // rows[pivot_row, col]
+                rows[others] = np.mod(rows[others] - quotients[:, np.newaxis] * rows[pivot_row], m)
+                nonzero = col + np.flatnonzero(rows[col:, col])
+            if len(nonzero) == 0 or math.gcd(int(rows[nonzero[0], col]), m) != 1:
+                return col
+            pivot_row = nonzero[0]
+
+        rows[[col, pivot_row]] = rows[[pivot_row, col]]
+        rows[col] = np.mod(rows[col] * pow(int(rows[col, col]), -1, m), m)
+        factors = rows[:, col].copy()
+        factors[col] = 0
+        rows[:] = np.mod(rows - factors[:, np.newaxis] * rows[col], m)
+    return None
 
 
 def random_mod_matrix(min, max, dimension):
-    random_matrix = np.random.randint(min, max, dimension)
-    if random_matrix.all == 0:
-        random_matrix = random_mod_matrix(min, max, dimension)
-    else:
-        inverse_mod = inverse_matrix(random_matrix, max)
-        if np.size(inverse_mod) == 1:
-            return random_mod_matrix(min, max, dimension)
-    return random_matrix
+    # Random invertible matrix mod max, see random_mod_matrices
+    return random_mod_matrices(1, min, max, dimension)[0]
+
+
+def random_mod_matrices(count, min, max, dimension):
+    # Generate count random invertible matrices mod max without rejection: every matrix is
+    # built as P * L * U, with P a permutation, L unit lower triangular and U upper
+    # triangular with units on the diagonal, so its determinant is a unit mod max
+    n = dimension[0]
+    lower = np.tril(np.random.randint(min, max, (count, n, n)), -1) + np.eye(n, dtype=int)
+    upper = np.triu(np.random.randint(min, max, (count, n, n)), 1)
+    diagonal = np.random.choice(mod_units(max), (count, n))
+    upper[:, np.arange(n), np.arange(n)] = diagonal
+    permutation = np.argsort(np.random.rand(count, n), axis=1)
+
+    lu = np.mod(np.matmul(lower, upper), max)
+    return np.take_along_axis(lu, permutation[:, :, np.newaxis], axis=1)
+
+
+@functools.lru_cache(maxsize=None)
+def mod_units(modulo):
+    # Invertible elements mod modulo
+    return np.array([x for x in range(1, modulo) if math.gcd(x, modulo) == 1], dtype=int)
 
 
 def text_to_matrix(dimension, text):
@@ -56,15 +109,70 @@ def text_to_matrix(dimension, text):
 
 
 def to_matrix(message, dimension, character_string):
-    modulo = len(character_string) - 1
-    character_to_number = OrderedDict(zip(character_string, range(0, modulo)))
-    return np.resize([character_to_number[x] for x in list(message)], dimension)
+    return np.resize(to_numbers(message, character_string), dimension)
 
 
 def to_message(matrix, character_string):
+    _, number_to_character = lookup_tables(character_string)
+    return number_to_character[np.asarray(matrix).ravel()].tobytes().decode('latin-1')
+
+
+@functools.lru_cache(maxsize=None)
+def lookup_tables(character_string):
+    # 256-entry table from character code to number (-1 if not in character_string),
+    # and table from number to character code, built once for each character string
     modulo = len(character_string) - 1
-    number_to_character = OrderedDict(zip(range(0, modulo), character_string))
-    return ''.join(number_to_character[x] for x in list(np.concatenate(list(matrix))))
+    character_to_number = np.full(256, -1, dtype=np.int64)
+    for number, character in zip(range(0, modulo), character_string):
+        character_to_number[ord(character)] = number
+    number_to_character = np.frombuffer(character_string[:modulo].encode('latin-1'), dtype=np.uint8)
+    return character_to_number, number_to_character
+
+
+def to_numbers(message, character_string):
+    character_to_number, _ = lookup_tables(character_string)
+    try:
+        codes = np.frombuffer(message.encode('latin-1'), dtype=np.uint8)
+    except UnicodeEncodeError as error:
+        raise KeyError(message[error.start]) from None
+    numbers = character_to_number[codes]
+    if np.any(numbers < 0):
+        raise KeyError(message[int(np.argmax(numbers < 0))])
+    return numbers
+
+
+def mod_dot(a, b, modulo):
+    # Matrix product mod modulo, with exact integers if the int64 sums could overflow
+    if np.size(a, 1) * (modulo - 1) ** 2 >= 2 ** 63:
+        return np.mod(np.dot(a.astype(object), b.astype(object)), modulo).astype(np.int64)
+    return np.mod(np.dot(a.astype(np.int64), b.astype(np.int64)), modulo)
+
+
+def translate_batch(input_messages, key_matrix):
+    # Multiply every message by the same key matrix: the message matrices are stacked
+    # side by side so a single modular product translates all of them
+    modulo = len(alphabet) - 1
+    dimension = np.size(key_matrix, 0)
+    message_matrices = [text_to_matrix(dimension, message) for message in input_messages]
+    if len(message_matrices) == 0:
+        return []
+    widths = np.cumsum([np.size(matrix, 1) for matrix in message_matrices])[:-1]
+    translated = mod_dot(np.asarray(key_matrix), np.hstack(message_matrices), modulo)
+    return [to_message(matrix, alphabet) for matrix in np.hsplit(translated, widths)]
+
+
+def encrypt_batch(input_messages, dimension):
+    # Encrypt many messages under one random key, returns the encrypted messages and the key
+    modulo = len(alphabet) - 1
+    cipher_matrix = random_mod_matrix(0, modulo, (dimension, dimension))
+    key_matrix = inverse_matrix(cipher_matrix, modulo)
+    return translate_batch(input_messages, cipher_matrix), to_message(key_matrix, alphabet)
+
+
+def decrypt_batch(input_messages, key):
+    key_matrix_column_length = int(len(key) ** .5)
+    key_matrix = to_matrix(key, (key_matrix_column_length, key_matrix_column_length), alphabet)
+    return translate_batch(input_messages, key_matrix)
 
 
 def encrypt(input_message, dimension):
@@ -73,7 +181,7 @@ def encrypt(input_message, dimension):
     cipher_matrix_dimension = (dimension, dimension)
     cipher_matrix = random_mod_matrix(0, modulo, cipher_matrix_dimension)
     key_matrix = inverse_matrix(cipher_matrix, modulo)
-    scrambled_message_matrix = np.mod(np.dot(cipher_matrix, input_message_matrix), modulo)
+    scrambled_message_matrix = mod_dot(cipher_matrix, input_message_matrix, modulo)
     return to_message(scrambled_message_matrix, alphabet), to_message(key_matrix, alphabet)
 
 
@@ -86,28 +194,26 @@ def decrypt(input_message, key):
     )
     key_matrix = to_matrix(key, key_matrix_dimension, alphabet)
     scrambled_message_matrix = to_matrix(input_message, scrambled_message_matrix_dimension, alphabet)
-    unscrambled_message_matrix = np.mod(np.dot(key_matrix, scrambled_message_matrix), modulo)
+    unscrambled_message_matrix = mod_dot(key_matrix, scrambled_message_matrix, modulo)
     return to_message(unscrambled_message_matrix, alphabet)
 
 
-def get_star_matrix(p, c, dimension):
-    modulo = len(alphabet) - 1
+def solve_key_matrix(p, c, modulo):
+    # Find the key k such that k * p = c mod modulo, using every known block (column of p and c).
+    # The system p^T * k^T = c^T is reduced mod modulo in one pass: if the plaintext blocks
+    # span the whole space the first rows of the reduced c^T are k^T
+    dimension = np.size(p, 0)
+    blocks = min(np.size(p, 1), np.size(c, 1))
+    rows = np.hstack([p[:, :blocks].T, c[:, :blocks].T]).astype(mod_dtype(modulo))
 
-    p_star = np.zeros(shape=(dimension, dimension), dtype=int)
-    c_star = np.zeros(shape=(dimension, dimension), dtype=int)
-    index = det = 0
-    while det <= 0 or math.gcd(det, modulo) != 1:
-        chosenBlocks = random.sample(range(np.size(p, 0)), dimension)
-        chosenBlocks.sort()
-        for i in chosenBlocks:
-            p_star[index] = p[i]
-            c_star[index] = c[i]
-            index += 1
-        p_star = p_star.transpose()
-        c_star = c_star.transpose()
-        det = int(round(np.linalg.det(p_star)))  # compute determinant of p_star
-        index = 0
-    return c_star, p_star
+    col = mod_row_reduce(rows, dimension, modulo)
+    if col is not None:
+        raise ValueError("The key is underdetermined: the %d known plaintext blocks have no invertible "
+                         "pivot in position %d, more (or different) plaintext is needed" % (blocks, col))
+    if np.any(rows[dimension:, dimension:]):
+        raise ValueError("The ciphertext is not the encryption of the plaintext with a key of dimension %d"
+                         % dimension)
+    return rows[:dimension, dimension:].T.astype(int)
 
 
 def known_plaintext_attack(plaintext, ciphertext, dimension):
@@ -116,10 +222,7 @@ def known_plaintext_attack(plaintext, ciphertext, dimension):
     p = text_to_matrix(dimension, plaintext)
     c = text_to_matrix(dimension, ciphertext)
 
-    c_star, p_star = get_star_matrix(p, c, dimension)
-
-    inverse_p_star = inverse_matrix(p_star, modulo)
-    key = c_star.dot(inverse_p_star) % modulo
+    key = solve_key_matrix(p, c, modulo)
     return to_message(key, alphabet)
 
 
@@ -146,8 +249,11 @@ def main():
             ciphertext = input("Enter the ciphertext: ")
             dimension = int(input("Enter the key dimension: "))
 
-            key = known_plaintext_attack(plaintext, ciphertext, dimension)
-            print("The key retrived is: ", key)
+            try:
+                key = known_plaintext_attack(plaintext, ciphertext, dimension)
+                print("The key retrived is: ", key)
+            except ValueError as error:
+                print(error, "\n")
 
         elif command == 4:
             break
@@ -1,6 +1,45 @@
 import re
+import os
+import csv
+import sys
 import math
-import matplotlib.pyplot as plot
+import json
+import argparse
+import hashlib
+import functools
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Number of (text, m) m-gram counts kept by count_m_grams
+M_GRAM_CACHE_SIZE = 32
+
+# Largest number of possible m-gram codes counted with np.bincount, np.unique is used above it
+# (or when there are much less m-grams than possible codes)
+BINCOUNT_LIMIT = 1 << 24
+
+# Number of characters read at a time by the streaming functions
+CHUNK_SIZE = 1 << 20
+
+# Version of the frequency table format written by save_table
+TABLE_FORMAT = 1
+
+# Suffix of the frequency table cached next to every counted file
+TABLE_SUFFIX = '.freq.json'
+
+# Values of m counted by default in the frequency tables
+TABLE_M_VALUES = (1, 2, 3, 4)
+
+# Formats written by write_report: images rendered by matplotlib or the data in csv
+REPORT_FORMATS = ('png', 'svg', 'csv')
+
+# letter frequency in the english dictionary, default reference distribution
+ENGLISH_LETTER_FREQUENCY = {'A': 0.08167, 'B': 0.01492, 'C': 0.02782, 'D': 0.04253, 'E': 0.12702, 'F': 0.02228,
+                            'G': 0.02015, 'H': 0.06094, 'I': 0.06966, 'J': 0.00153, 'K': 0.00772, 'L': 0.04025,
+                            'M': 0.02406, 'N': 0.06749, 'O': 0.07507, 'P': 0.01929, 'Q': 0.00095, 'R': 0.05987,
+                            'S': 0.06327, 'T': 0.09056, 'U': 0.02758, 'V': 0.00978, 'W': 0.02360, 'X': 0.00150,
+                            'Y': 0.01974, 'Z': 0.00074}
 
 
 def get_text():
@@ -15,19 +54,62 @@ def trim_text(text):
     return text
 
 
-def get_letter_count(message, m):
-    # Returns a dictionary with keys of single letters and values of the
-    # count of how many times they appear in the message parameter:
-    letter_count = {}
-    for i in range(0, len(message)):
-        t = message[i * m:(i * m) + m]
-        if len(t) == m:
-            if t in letter_count:
-                letter_count[t] += 1
-            else:
-                letter_count[t] = 1
+def get_letter_count(message, m, overlapping=False):
+    # Returns a dictionary with keys of m-grams and values of the
+    # count of how many times they appear in the message parameter.
+    # The m-grams are message[i*m:(i*m)+m], or message[i:i+m] if overlapping
+    return dict(count_m_grams(message, m, overlapping))
+
+
+@functools.lru_cache(maxsize=M_GRAM_CACHE_SIZE)
+def count_m_grams(message, m, overlapping=False):
+    # Memoized m_gram_counter, so the statistics on the same text and m share one count
+    return m_gram_counter(message, m, overlapping)
+
+
+def m_gram_counter(message, m, overlapping=False):
+    # Every m-gram is encoded as an integer in base b (26 for an A-Z text, the number of
+    # distinct symbols otherwise) and the codes are counted in a single pass
+    if len(message) < m:
+        return {}
+    symbols, codes = symbol_codes(message)
+    base = len(symbols)
+    if base ** m >= 2 ** 63:
+        return count_m_grams_slices(message, m, overlapping)
+
+    if overlapping:
+        windows = np.lib.stride_tricks.sliding_window_view(codes, m)
+    else:
+        windows = codes[:(len(codes) // m) * m].reshape(-1, m)
+    gram_codes = windows @ (base ** np.arange(m - 1, -1, -1, dtype=np.int64))
+
+    if base ** m <= min(BINCOUNT_LIMIT, 16 * len(gram_codes)):
+        counts = np.bincount(gram_codes, minlength=base ** m)
+        grams = np.flatnonzero(counts)
+        counts = counts[grams]
+    else:
+        grams, counts = np.unique(gram_codes, return_counts=True)
+
+    # decode the m-gram codes back to strings
+    digits = (grams[:, np.newaxis] // (base ** np.arange(m - 1, -1, -1, dtype=np.int64))) % base
+    gram_points = np.ascontiguousarray(symbols[digits], dtype=np.uint32)
+    keys = gram_points.tobytes().decode('utf-32-le')
+    return {keys[i * m:(i * m) + m]: count for i, count in enumerate(counts.tolist())}
+
 
-    return letter_count
+def symbol_codes(message):
+    # Symbols of message (A-Z for an A-Z text, its distinct characters otherwise) as
+    # code points, and message as an array of indices in the symbols
+    points = np.frombuffer(message.encode('utf-32-le'), dtype=np.uint32)
+    if len(points) > 0 and points.min() >= ord('A') and points.max() <= ord('Z'):
+        return np.arange(ord('A'), ord('Z') + 1, dtype=np.uint32), points.astype(np.int64) - ord('A')
+    return np.unique(points, return_inverse=True)
+
+
+def count_m_grams_slices(message, m, overlapping=False):
+    # Plain Counter of the m-grams, for alphabets too large to encode them in an int64
+    step = 1 if overlapping else m
+    return dict(Counter(message[i:i + m] for i in range(0, len(message) - m + 1, step)))
 
 
 def get_item_at_index_zero(items):
@@ -38,24 +120,29 @@ def get_item_at_index_one(items):
     return items[1]
 
 
-def get_frequency_order(message, m):
+def get_frequency_order(message, m, plot=True):
     # First, get a dictionary of each letter and its frequency count:
-    letter_to_freq = get_letter_count(message, m)
+    return frequency_order_from_count(get_letter_count(message, m), m, plot)
+
 
+def frequency_order_from_count(letter_to_freq, m, plot=True):
     # convert the letter_to_freq dictionary to a list of
     # tuple pairs (key, value), then sort them:
     freq_pairs = list(letter_to_freq.items())
     freq_pairs.sort(key=get_item_at_index_one, reverse=True)
 
-    xlist, ylist = set_xy_plot(freq_pairs)
-
-    createPlot(xlist, ylist, 'letter', 'frequency', 'LetterFrequency', get_number_x_data(m))
+    if plot:
+        xlist, ylist = set_xy_plot(freq_pairs)
+        createPlot(xlist, ylist, 'letter', 'frequency', 'LetterFrequency', get_number_x_data(m))
 
     return freq_pairs
 
 
-def get_m_grams_distributions(message, m):
-    letter_to_freq = get_letter_count(message, m)
+def get_m_grams_distributions(message, m, plot=True):
+    return m_grams_distribution_from_count(get_letter_count(message, m), m, plot)
+
+
+def m_grams_distribution_from_count(letter_to_freq, m, plot=True):
     total_grams = sum(letter_to_freq.values())
 
     grams_dict = {}
@@ -65,9 +152,9 @@ def get_m_grams_distributions(message, m):
     sorted_grams_dict = list(grams_dict.items())
     sorted_grams_dict.sort(key=get_item_at_index_one, reverse=True)
 
-    xlist, ylist = set_xy_plot(sorted_grams_dict)
-
-    createPlot(xlist, ylist, 'letter', 'probability', 'distribution', get_number_x_data(m))
+    if plot:
+        xlist, ylist = set_xy_plot(sorted_grams_dict)
+        createPlot(xlist, ylist, 'letter', 'probability', 'distribution', get_number_x_data(m))
 
     return sorted_grams_dict
 
@@ -92,8 +179,11 @@ def set_xy_plot(dict):
     return xlist, ylist
 
 
-def index_of_confidence(message, m):
-    letter_to_freq = get_letter_count(message, m)
+def index_of_confidence(message, m, overlapping=False):
+    return index_of_confidence_from_count(get_letter_count(message, m, overlapping))
+
+
+def index_of_confidence_from_count(letter_to_freq):
     ic = 0.0
     total_grams = sum(letter_to_freq.values())
 
@@ -102,10 +192,14 @@ def index_of_confidence(message, m):
     return ic
 
 
-def entropy(message, m):
-    letter_to_freq = get_letter_count(message, m)
+def entropy(message, m, overlapping=False):
+    return entropy_from_count(get_letter_count(message, m, overlapping), len(message), m, overlapping)
+
+
+def entropy_from_count(letter_to_freq, length, m, overlapping=False):
+    # length is the number of characters of the text the m-grams were counted on
     e = 0.0
-    n = math.ceil(len(message) / m)
+    n = math.ceil(length / m) if not overlapping else length - m + 1
 
     for value in letter_to_freq.values():
         e += (value / n) * math.log(value / n, 2)
@@ -113,16 +207,307 @@ def entropy(message, m):
     return -e
 
 
-def createPlot(x_data, y_data, x_label, y_label, plot_title, number_x_data=26):
+def window_profile(message, window, m_values=TABLE_M_VALUES):
+    # Index of coincidence and entropy of the overlapping m-grams of every window of
+    # window characters of message (step 1), as index_of_confidence and entropy with
+    # overlapping=True on message[k:k + window]. Returns a dictionary m -> array with
+    # one row [ic, entropy] for each window
+    return {m: m_gram_window_profile(message, window, m) for m in m_values}
+
+
+def m_gram_window_profile(message, window, m):
+    # Sliding the window of one character removes one m-gram and adds one, so the sums
+    # S = sum c * (c - 1) and T = sum c * log2(c) over the m-gram counts c change by a
+    # term that depends only on the counts of those two m-grams: every window is the
+    # previous one plus these deltas, accumulated with a cumulative sum.
+    # The counts of the two m-grams are their occurrences at less than window - m positions,
+    # precomputed for every position, so no window is ever recounted
+    grams = window - m + 1
+    if grams < 2:
+        raise ValueError("The window must be longer than m")
+    if len(message) < window:
+        return np.zeros((0, 2))
+
+    symbols, codes = symbol_codes(message)
+    base = len(symbols)
+    windows = np.lib.stride_tricks.sliding_window_view(codes, m)
+    n = len(windows)
+    if base ** m * n < 2 ** 63:
+        gram_ids = windows @ (base ** np.arange(m - 1, -1, -1, dtype=np.int64))
+    else:
+        _, gram_ids = np.unique(windows, axis=0, return_inverse=True)
+        gram_ids = gram_ids.ravel().astype(np.int64)
+
+    # number of occurrences of the same m-gram in the grams - 1 positions before and after every
+    # position, searched in the positions sorted by m-gram (the queries are sorted too)
+    sorted_keys = np.sort(gram_ids * n + np.arange(n))
+    sorted_ids, order = np.divmod(sorted_keys, n)
+    first = np.searchsorted(sorted_keys, sorted_ids * n + np.maximum(order - (grams - 1), 0), side='left')
+    last = np.searchsorted(sorted_keys, sorted_ids * n + np.minimum(order + (grams - 1), n - 1), side='right')
+    before = np.empty(n, dtype=np.int64)
+    after = np.empty(n, dtype=np.int64)
+    before[order] = np.arange(n) - first
+    after[order] = last - np.arange(n) - 1
+
+    # c * log2(c) for every possible count c in a window
+    c_log_c = np.arange(grams + 1) * np.log2(np.maximum(np.arange(grams + 1), 1))
+
+    _, first_counts = np.unique(gram_ids[:grams], return_counts=True)
+    s0 = int(np.sum(first_counts * (first_counts - 1)))
+    t0 = float(np.sum(c_log_c[first_counts]))
+
+    # count of the leaving m-gram in the window, and of the entering one once the other has left
+    leaving = 1 + after[:n - grams]
+    entering = before[grams:]
+
+    s_deltas = 2 * entering - 2 * (leaving - 1)
+    t_deltas = (c_log_c[entering + 1] - c_log_c[entering]) - (c_log_c[leaving] - c_log_c[leaving - 1])
+    s = s0 + np.concatenate(([0], np.cumsum(s_deltas)))
+    t = t0 + np.concatenate(([0.0], np.cumsum(t_deltas)))
+
+    ic = s / (grams * (grams - 1))
+    e = math.log2(grams) - t / grams
+    return np.column_stack((ic, e))
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    with open(path, 'r') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def trim_chunks(chunks):
+    # get_text and trim_text only delete or uppercase single characters, so
+    # trimming the chunks one by one gives the same text as trim_text(get_text())
+    for chunk in chunks:
+        yield trim_text(chunk.replace('\n', ''))
+
+
+def stream_letter_count(chunks, m_values, overlapping=False):
+    # Count the m-grams of a sequence of trimmed chunks for every m in m_values.
+    # The characters at the end of a chunk that don't complete an m-gram (at most m - 1)
+    # are carried to the next chunk, so the counts are the ones of the joined text.
+    # Returns a dictionary of m-gram counts for every m and the length of the text
+    counts = {m: Counter() for m in m_values}
+    carry = {m: '' for m in m_values}
+    length = 0
+    for chunk in chunks:
+        length += len(chunk)
+        for m in m_values:
+            text = carry[m] + chunk
+            counts[m].update(m_gram_counter(text, m, overlapping))
+            if overlapping:
+                carry[m] = text[max(len(text) - m + 1, 0):]
+            else:
+                carry[m] = text[len(text) - len(text) % m:]
+    return {m: dict(sorted(counts[m].items())) for m in m_values}, length
+
+
+def corpus_statistics(path, m_values=range(1, 5), overlapping=False, chunk_size=CHUNK_SIZE):
+    # Index of coincidence and entropy of the m-grams of a text file of any size, reading
+    # chunk_size characters at a time. Returns a dictionary m -> (ic, entropy)
+    counts, length = stream_letter_count(trim_chunks(read_chunks(path, chunk_size)), m_values, overlapping)
+    return {m: (index_of_confidence_from_count(counts[m]), entropy_from_count(counts[m], length, m, overlapping))
+            for m in m_values}
+
+
+def count_file(path, m_values=TABLE_M_VALUES, overlapping=False, chunk_size=CHUNK_SIZE):
+    # Frequency table of a text file: the m-gram counts of the trimmed text for every m in
+    # m_values, the length of the trimmed text and the source file with its sha256 fingerprint
+    digest = hashlib.sha256()
+    chunks = trim_chunks(hashed_chunks(read_chunks(path, chunk_size), digest))
+    counts, length = stream_letter_count(chunks, m_values, overlapping)
+    stat = os.stat(path)
+    source = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+              'sha256': digest.hexdigest()}
+    return {'format': TABLE_FORMAT, 'overlapping': overlapping, 'length': length, 'sources': [source],
+            'counts': counts}
+
+
+def hashed_chunks(chunks, digest):
+    # Pass the chunks through, feeding them to the digest
+    for chunk in chunks:
+        digest.update(chunk.encode('utf-8'))
+        yield chunk
+
+
+def file_fingerprint(path, chunk_size=CHUNK_SIZE):
+    # sha256 fingerprint of a text file, the same of the source entry of count_file
+    digest = hashlib.sha256()
+    for chunk in hashed_chunks(read_chunks(path, chunk_size), digest):
+        pass
+    return digest.hexdigest()
+
+
+def merge_tables(tables):
+    # Sum the m-gram counts of frequency tables of different files (m-grams across
+    # two files are not counted), keeping only the values of m in all of them
+    tables = list(tables)
+    if len({table['overlapping'] for table in tables}) != 1:
+        raise ValueError("Only tables with the same overlapping mode can be merged")
+    m_values = sorted(set.intersection(*(set(table['counts']) for table in tables)))
+    counts = {m: Counter() for m in m_values}
+    for table in tables:
+        for m in m_values:
+            counts[m].update(table['counts'][m])
+    return {'format': TABLE_FORMAT, 'overlapping': tables[0]['overlapping'],
+            'length': sum(table['length'] for table in tables),
+            'sources': [source for table in tables for source in table['sources']],
+            'counts': {m: dict(sorted(counts[m].items())) for m in m_values}}
+
+
+def save_table(table, path):
+    with open(path, 'w') as file:
+        json.dump(dict(table, counts={str(m): grams for m, grams in table['counts'].items()}), file,
+                  separators=(',', ':'))
+
+
+def load_table(path):
+    with open(path, 'r') as file:
+        table = json.load(file)
+    if table.get('format') != TABLE_FORMAT:
+        raise ValueError("%s is not a frequency table of format %d" % (path, TABLE_FORMAT))
+    table['counts'] = {int(m): grams for m, grams in table['counts'].items()}
+    return table
+
+
+def is_table_valid(table, path, m_values, overlapping):
+    # A cached table can be reused if it counts every m in m_values in the same mode
+    # and the file didn't change since: same size and modification time or, if only
+    # the modification time changed (e.g. a copied file), same sha256 fingerprint
+    stat = os.stat(path)
+    source = table['sources'][0]
+    if (table['overlapping'] != overlapping or not set(m_values) <= set(table['counts'])
+            or source['size'] != stat.st_size):
+        return False
+    return source['mtime'] == stat.st_mtime or source['sha256'] == file_fingerprint(path)
+
+
+def table_cache_path(path, cache_dir=None):
+    # The cached table of a file is path + TABLE_SUFFIX or, with a cache directory, a file
+    # in it named after the file and a hash of its absolute path
+    if cache_dir is None:
+        return path + TABLE_SUFFIX
+    key = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, '%s-%s%s' % (os.path.basename(path), key, TABLE_SUFFIX))
+
+
+def cached_count_file(path, m_values=TABLE_M_VALUES, overlapping=False, chunk_size=CHUNK_SIZE, cache_dir=None):
+    # count_file, reusing (or writing) the table cached in table_cache_path. Writing the
+    # cache is best-effort: a read-only corpus is counted all the same
+    table_path = table_cache_path(path, cache_dir)
+    if os.path.exists(table_path):
+        try:
+            table = load_table(table_path)
+            if is_table_valid(table, path, m_values, overlapping):
+                return table
+        except (ValueError, KeyError, IndexError):
+            pass
+    table = count_file(path, m_values, overlapping, chunk_size)
+    try:
+        save_table(table, table_path)
+    except OSError:
+        pass
+    return table
+
+
+def corpus_files(paths):
+    # The files of paths, every directory is replaced by the .txt files in it
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.txt'))
+        else:
+            files.append(path)
+    return files
+
+
+def analyze_corpus(paths, m_values=TABLE_M_VALUES, overlapping=False, workers=None, chunk_size=CHUNK_SIZE,
+                   cache_dir=None):
+    # Count the files (or directories of .txt files) of paths in a process pool, reusing
+    # their cached frequency tables, and merge the results in a single table
+    count = functools.partial(cached_count_file, m_values=m_values, overlapping=overlapping, chunk_size=chunk_size,
+                              cache_dir=cache_dir)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return merge_tables(executor.map(count, corpus_files(paths)))
+
+
+def table_index_of_confidence(table, m):
+    return index_of_confidence_from_count(table['counts'][m])
+
+
+def table_entropy(table, m):
+    return entropy_from_count(table['counts'][m], table['length'], m, table['overlapping'])
+
+
+def reference_distribution(table_path=None):
+    # Letter distribution used as reference for english text: the 1-gram probabilities of
+    # a frequency table, or ENGLISH_LETTER_FREQUENCY if no table is given
+    if table_path is None:
+        return dict(ENGLISH_LETTER_FREQUENCY)
+    letter_count = load_table(table_path)['counts'][1]
+    total = sum(letter_count.get(letter, 0) for letter in ENGLISH_LETTER_FREQUENCY)
+    return {letter: letter_count.get(letter, 0) / total for letter in ENGLISH_LETTER_FREQUENCY}
+
+
+def get_pyplot(headless=False):
+    # matplotlib is imported only when a plot is requested, with a
+    # non-interactive backend if the plot is only saved to a file
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plot
+    return plot
+
+
+def createPlot(x_data, y_data, x_label, y_label, plot_title, number_x_data=26, output=None):
+    # Show the bar plot in a window, or save it to the output file (png, svg, ...) without any display
     if number_x_data is not None:
         x_data = x_data[0:number_x_data]
         y_data = y_data[0:number_x_data]
 
+    plot = get_pyplot(headless=output is not None)
+    plot.figure()
     plot.bar(x_data, y_data)
     plot.xlabel(x_label)
     plot.ylabel(y_label)
     plot.title(plot_title)
-    plot.show()
+    if output is None:
+        plot.show()
+    else:
+        plot.savefig(output)
+        plot.close()
+
+
+def write_csv(pairs, x_label, y_label, output):
+    with open(output, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow([x_label, y_label])
+        writer.writerows(pairs)
+
+
+def write_report(letter_counts, directory, formats=REPORT_FORMATS):
+    # Write the m-grams frequency and distribution of letter_counts (a dictionary m -> m-gram counts,
+    # like the counts of a frequency table) to directory, one file for each m and format.
+    # The csv files hold every m-gram, the plots only the most frequent ones. Returns the written files
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for m, letter_to_freq in sorted(letter_counts.items()):
+        reports = [('frequency', frequency_order_from_count(letter_to_freq, m, plot=False), 'LetterFrequency'),
+                   ('probability', m_grams_distribution_from_count(letter_to_freq, m, plot=False), 'distribution')]
+        for y_label, pairs, title in reports:
+            for file_format in formats:
+                output = os.path.join(directory, '%d-grams_%s.%s' % (m, title, file_format))
+                if file_format == 'csv':
+                    write_csv(pairs, 'letter', y_label, output)
+                else:
+                    xlist, ylist = set_xy_plot(pairs)
+                    createPlot(xlist, ylist, 'letter', y_label, title, get_number_x_data(m), output)
+                written.append(output)
+    return written
 
 
 # Print the main menu and asks user input
@@ -132,18 +517,44 @@ def menu():
         print("1) Histogram of the frequency of the 26 letters.")
         print("2) Empirical distribution of m-grams.")
         print("3) Index of coincidence and entropy of the m-grams distribution.")
-        print("4) Quit.\n")
+        print("4) Index of coincidence and entropy of a corpus of files.")
+        print("5) Quit.\n")
         try:
             choice = int(input("Select a function to run: "))
-            if 1 <= choice <= 4:
+            if 1 <= choice <= 5:
                 return choice
             else:
-                print("\nYou must enter a number from 1 to 4\n")
+                print("\nYou must enter a number from 1 to 5\n")
         except ValueError:
-            print("\nYou must enter a number from 1 to 4\n")
+            print("\nYou must enter a number from 1 to 5\n")
+
+
+def batch(args):
+    # Non-interactive analysis of a corpus: print index of coincidence and entropy
+    # and write the reports, never opening a window
+    table = analyze_corpus(args.files, tuple(args.m), workers=args.workers, cache_dir=args.cache_dir)
+    for m in args.m:
+        print(m, "-grams index of coincidence:", table_index_of_confidence(table, m),
+              "entropy:", table_entropy(table, m))
+    if args.report is not None:
+        for output in write_report(table['counts'], args.report, args.format):
+            print("Written", output)
 
 
 def main():
+    if len(sys.argv) > 1:
+        parser = argparse.ArgumentParser(description='Frequency analysis of a corpus of text files.')
+        parser.add_argument('files', nargs='+', help='text files or directories of .txt files')
+        parser.add_argument('-m', type=int, nargs='+', default=list(TABLE_M_VALUES), help='values of m')
+        parser.add_argument('-r', '--report', help='directory of the frequency and distribution reports')
+        parser.add_argument('-f', '--format', nargs='+', choices=REPORT_FORMATS, default=['png'],
+                            help='formats of the reports')
+        parser.add_argument('-w', '--workers', type=int, help='number of worker processes')
+        parser.add_argument('-c', '--cache-dir', help='directory of the cached frequency tables '
+                                                      '(default: next to every file)')
+        batch(parser.parse_args())
+        return
+
     # Read Moby_Dick_chapter_one.txt and sanitize for the analysis
     text = trim_text(get_text())
     # text = trim_text("hello world")
@@ -169,6 +580,13 @@ def main():
                 print("Entropy of the m-grams distribution: ", entropy(text, m))
             input("\nPress Enter to continue.")
         elif choice == 4:
+            paths = input("\nInsert the files or directories of the corpus (separated by spaces): ").split()
+            table = analyze_corpus(paths)
+            for m in TABLE_M_VALUES:
+                print("\nIndex of coincidence of the ", m, "-grams distribution: ", table_index_of_confidence(table, m))
+                print("Entropy of the m-grams distribution: ", table_entropy(table, m))
+            input("\nPress Enter to continue.")
+        elif choice == 5:
             break
 
 
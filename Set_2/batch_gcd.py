@@ -0,0 +1,139 @@
+import argparse
+import math
+import os
+import pickle
+import tempfile
+import time
+from typing import NamedTuple
+
+# GMP divides multi-megabit integers in subquadratic time, while the division of Python integers
+# is quadratic (measured on CPython 3.11): the trees use gmpy2 integers when it is installed
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+# Weak key found by the batch gcd: position of the modulus in the input, the modulus and its
+# factors (p = q = None if the modulus is duplicated, so the factors can't be told apart)
+class WeakKey(NamedTuple):
+    index: int
+    n: int
+    p: int
+    q: int
+
+
+# Levels of a product tree: kept in memory, or saved one per file in a directory so that only the
+# level being built (or descended) is loaded at a time
+class TreeLevels:
+    __slots__ = ('directory', 'levels', 'count')
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.levels = []
+        self.count = 0
+
+    def append(self, level):
+        if self.directory is None:
+            self.levels.append(level)
+        else:
+            with open(os.path.join(self.directory, 'level-%d' % self.count), 'wb') as f:
+                pickle.dump(level, f, pickle.HIGHEST_PROTOCOL)
+        self.count += 1
+
+    def __getitem__(self, i):
+        if self.directory is None:
+            return self.levels[i]
+        with open(os.path.join(self.directory, 'level-%d' % i), 'rb') as f:
+            return pickle.load(f)
+
+    def __len__(self):
+        return self.count
+
+
+# Build Bernstein's product tree of the moduli level by level: level 0 is the moduli, every node is
+# the product of its two children, and the last level is the product of all the moduli.
+# Only the previous level is needed to build the next one
+def product_tree(moduli, directory=None):
+    levels = TreeLevels(directory)
+    level = [gmpy2.mpz(n) for n in moduli] if gmpy2 is not None else list(moduli)
+    levels.append(level)
+    while len(level) > 1:
+        level = [level[i] * level[i + 1] if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)]
+        levels.append(level)
+    return levels
+
+
+# Descend the remainder tree: the product P of all the moduli is reduced modulo the square of
+# every node, level by level, down to P mod n^2 for every modulus n. Then gcd(P / n mod n, n) is
+# the product of the factors n shares with the other moduli
+def remainder_tree(levels):
+    remainders = levels[len(levels) - 1]
+    for i in range(len(levels) - 2, -1, -1):
+        level = levels[i]
+        remainders = [remainders[j // 2] % (n * n) for j, n in enumerate(level)]
+    gcd = gmpy2.gcd if gmpy2 is not None else math.gcd
+    return [int(gcd(r // n, n)) for r, n in zip(remainders, level)]
+
+
+# Batch gcd of the moduli: return the gcd of every modulus with the product of all the others.
+# With gmpy2 the cost is quasi-linear in the total size of the moduli; with Python integers the
+# divisions of the top levels of the remainder tree are quadratic, and so is the whole batch gcd
+def batch_gcd(moduli, directory=None):
+    moduli = list(moduli)
+    if len(moduli) < 2:
+        return [1] * len(moduli)
+    return remainder_tree(product_tree(moduli, directory))
+
+
+# Find the weak keys among the moduli: the ones with a factor in common with another modulus.
+# When a modulus shares both its factors (the gcd is the modulus itself), it is split with the
+# pairwise gcd against the other weak moduli
+def find_weak_keys(moduli, directory=None):
+    moduli = list(moduli)
+    gcds = batch_gcd(moduli, directory)
+    weak = [i for i, g in enumerate(gcds) if g != 1]
+    keys = []
+    for i in weak:
+        n, g = moduli[i], gcds[i]
+        if g == n:
+            g = next((h for h in (math.gcd(n, moduli[j]) for j in weak if j != i) if h not in (1, n)), n)
+        keys.append(WeakKey(i, n, None, None) if g == n else WeakKey(i, n, g, n // g))
+    return keys
+
+
+# Read the moduli from a file, one per line, in decimal or hexadecimal with the 0x prefix
+# (the empty lines and the ones starting with # are ignored)
+def read_moduli(path):
+    with open(path) as f:
+        return [int(line, 0) for line in (line.split('#', 1)[0].strip() for line in f) if line]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the RSA moduli with shared factors with the batch gcd.')
+    parser.add_argument('moduli', help='file of the moduli, one per line')
+    parser.add_argument('-d', '--disk', action='store_true',
+                        help='keep the levels of the product tree in temporary files instead of memory')
+    args = parser.parse_args()
+
+    moduli = read_moduli(args.moduli)
+    if gmpy2 is None:
+        print("gmpy2 is not installed: the batch gcd takes quadratic time in the number of moduli\n")
+    start = time.perf_counter()
+    if args.disk:
+        with tempfile.TemporaryDirectory() as directory:
+            weak_keys = find_weak_keys(moduli, directory)
+    else:
+        weak_keys = find_weak_keys(moduli)
+    end = time.perf_counter()
+
+    for key in weak_keys:
+        if key.p is None:
+            print("Modulus", key.index + 1, "is duplicated:", key.n)
+        else:
+            print("Modulus", key.index + 1, "is weak:", key.n, "=", key.p, "*", key.q)
+    print("\nWeak keys:", len(weak_keys), "of", len(moduli), "in", end - start, "seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,69 @@
-from decimal import Decimal
+import sys
 
+import public_key_algorithms
+from modular_arithmetic import batch_inverse, extended_gcd
 
-def extended_euclidean_algorithm(a, b):
-    x0, x1, y0, y1 = 0, 1, 1, 0
-    while a != 0:
-        q, b, a = b // a, a, b % a
-        y0, y1 = y1, y0 - q * y1
-        x0, x1 = x1, x0 - q * x1
-    return b, x0, y0
+
+# Attacco al modulo comune: dati i ciphertext c_i dello stesso messaggio m cifrato con esponenti e_i
+# diversi ma con lo stesso modulo n, calcola i coefficienti di Bezout a_i tali che
+# 1 = mcd(e_1, ..., e_k) = a_1*e_1 + ... + a_k*e_k e ricava m = c_1^a_1 * ... * c_k^a_k mod n.
+# Le potenze sono modulari e per i coefficienti negativi si usa l'inverso di c_i (calcolati tutti
+# insieme con batch_inverse). Solleva ValueError se gli esponenti non sono coprimi
+def common_modulus_attack(n, pairs):
+    pairs = list(pairs)
+    # aggiungo gli esponenti uno alla volta, fermandomi appena il mcd diventa 1
+    coefficients = []
+    gcd = 0
+    for c, e in pairs:
+        gcd, x, y = extended_gcd(gcd, e)
+        coefficients = [a * x for a in coefficients] + [y]
+        if gcd == 1:
+            break
+    if gcd != 1:
+        raise ValueError("The exponents are not coprime (gcd %d)" % gcd)
+
+    ciphertexts = [c for c, _ in pairs[:len(coefficients)]]
+    negatives = [i for i, a in enumerate(coefficients) if a < 0]
+    for i, inv in zip(negatives, batch_inverse([ciphertexts[i] for i in negatives], n)):
+        ciphertexts[i] = inv
+
+    m = 1
+    for c, a in zip(ciphertexts, coefficients):
+        m = m * public_key_algorithms.fast_exp_alg(c, abs(a), n) % n
+    return m
+
+
+# Legge i messaggi intercettati da un file con una riga "n e c" per messaggio (le righe vuote e
+# quelle che iniziano con # sono ignorate) e li raggruppa per modulo, nell'ordine del file
+def read_intercepted(path):
+    groups = {}
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                n, e, c = (int(v) for v in line.replace(',', ' ').split())
+                groups.setdefault(n, []).append((c, e))
+    return groups
+
+
+# Esegue l'attacco su tutti i moduli del file che hanno almeno due messaggi, restituisce per ogni
+# modulo il messaggio trovato (None se l'attacco non è possibile)
+def batch_attack(path):
+    results = {}
+    for n, pairs in read_intercepted(path).items():
+        try:
+            results[n] = common_modulus_attack(n, pairs) if len(pairs) > 1 else None
+        except ValueError:
+            results[n] = None
+    return results
 
 
 def main():
+    if len(sys.argv) > 1:
+        for n, m in batch_attack(sys.argv[1]).items():
+            print(n, m if m is not None else "ND")
+        return
+
     c1 = 13740701343175031613859506260680271  # primo ciphertext intercettato
     c2 = 442020648620790478265510268903148188611479520134128911  # secondo ciphertext intercettato
     e1 = 7
@@ -18,23 +71,16 @@ def main():
 
     n = 1200867589138402836833011627922648843865398758356119243237528992192661195883356632897345588719304934438534205354787918897834861577085344762327143956220911721261528444200091612203799709834594997775067917847690315178675148605331912292785817786238119642200812571328900475396454557843711810878201457471117182510681991129539167165552073440243913144926216242708247975357913354302233984628116835035339887667027876020733894592318754941490852771134623356130705203596572659
 
-    # calcolo i coefficienti di Bezout x, y tali che d = mcd(d1,d2) = d1*x +d2*y
-    _, x, y = extended_euclidean_algorithm(e1, e2)
-
     # calcolo del plaintext basato sull'identità di Bezout
-
-    m = Decimal((c1 ** x) * (c2 ** y)) % n
-    m = int(m)
+    m = common_modulus_attack(n, [(c1, e1), (c2, e2)])
     print(m)
 
     # encryption del messaggio con la prima chiave per verifica
-    t1 = (m ** e1) % n
-    t1 = int(t1)
+    t1 = public_key_algorithms.fast_exp_alg(m, e1, n)
     print(t1 == c1)
 
     # encryption del messaggio con la seconda chiave per verifica
-    t2 = (m ** e2) % n
-    t2 = int(t2)
+    t2 = public_key_algorithms.fast_exp_alg(m, e2, n)
     print(t2 == c2)
 
 
@@ -1,8 +1,30 @@
+import argparse
+import itertools
+import json
 import math
+import multiprocessing
+import os
+import platform
 import random
+import sys
 import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import NamedTuple
+
 import public_key_algorithms
 
+# Number of random bases tried by a worker of decryptionexp_parallel before reporting back
+ATTACK_BATCH_SIZE = 8
+
+# Defaults of the benchmark: keys per modulus size, warmup attacks and seed
+BENCHMARK_KEYS = 20
+BENCHMARK_WARMUP = 3
+BENCHMARK_SEED = 0
+
+# Smallest modulus size of the benchmark: below it there may be a single prime of the size of
+# p and q, which must be distinct
+BENCHMARK_MIN_BITS = 10
+
 
 # Get input from the user
 def get_input(message):
@@ -25,15 +47,181 @@ def decryptionexp(n, d, e):
     while True:
         it = it + 1
         x = random.randint(1, n - 1)
-        if math.gcd(x, n) != 1:
-            return x, it
-        v = public_key_algorithms.fast_exp_alg(x, _m, n)
+        factor = attack_base(n, r, _m, x)
+        if factor is not None:
+            return factor, it
+
+
+# Try the base x: if gcd(x, n) > 1, or if the sequence x^m, x^2m, ..., x^(2^r m) reaches 1 through a
+# square root of 1 other than -1, return the non trivial factor of n found, otherwise None.
+# The squarings are a single multiply-mod each, and at most r of them are needed
+def attack_base(n, r, m, x):
+    if math.gcd(x, n) != 1:
+        return math.gcd(x, n)
+    v = public_key_algorithms.fast_exp_alg(x, m, n)
+    if v == 1:
+        return None
+    for i in range(r):
+        v0, v = v, v * v % n
         if v == 1:
-            continue
-        while v != 1:
-            v0, v = v, public_key_algorithms.fast_exp_alg(v, 2, n)
-        if v0 != -1 and v0 != n - 1:
-            return math.gcd(v0 + 1, n), it
+            return math.gcd(v0 + 1, n) if v0 != n - 1 else None
+    raise ValueError("e and d are not a valid RSA key pair for n")
+
+
+# Stop event shared by the attack workers, set once a factor is found
+attack_stop = None
+
+
+# Process pool initializer of the attack workers
+def init_attack_worker(stop):
+    global attack_stop
+    attack_stop = stop
+
+
+# Try a batch of random bases drawn from the given seed (the operating system entropy if None),
+# stopping early if another worker already found a factor. Return the factor (or None), the
+# number of bases tried and the time spent
+def attack_batch(n, r, m, seed, size):
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    tried = 0
+    for i in range(size):
+        if attack_stop is not None and attack_stop.is_set():
+            break
+        tried += 1
+        factor = attack_base(n, r, m, rng.randint(1, n - 1))
+        if factor is not None:
+            if attack_stop is not None:
+                attack_stop.set()
+            return factor, tried, time.perf_counter() - start
+    return None, tried, time.perf_counter() - start
+
+
+# Result of the parallel decryption exponent attack: the factor, the number of bases tried by all
+# the workers, the number of batches, the wall clock time and the mean time spent on a base
+class AttackResult(NamedTuple):
+    factor: int
+    iterations: int
+    batches: int
+    elapsed: float
+    iteration_time: float
+
+
+# Decryption exponent attack racing batches of ATTACK_BATCH_SIZE random bases on a pool of worker
+# processes: as soon as one of them finds a non trivial factor, the batches still queued are
+# cancelled and the running ones stop at their next base. With a seed, the i-th batch draws its
+# bases from seed + i; with one worker, the batches run in this process
+def decryptionexp_parallel(n, d, e, workers=None, batch_size=ATTACK_BATCH_SIZE, seed=None):
+    start = time.perf_counter()
+    r, m = numberDecomposition(e * d - 1)
+    workers = workers or os.cpu_count() or 1
+    seeds = (None if seed is None else seed + i for i in itertools.count())
+    iterations, busy_time, batches = 0, 0, 0
+
+    if workers == 1:
+        while True:
+            factor, tried, spent = attack_batch(n, r, m, next(seeds), batch_size)
+            iterations, busy_time, batches = iterations + tried, busy_time + spent, batches + 1
+            if factor is not None:
+                return AttackResult(factor, iterations, batches, time.perf_counter() - start, busy_time / iterations)
+
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_attack_worker, initargs=(stop,))
+    try:
+        pending = set()
+        while True:
+            while len(pending) < 2 * workers:
+                pending.add(executor.submit(attack_batch, n, r, m, next(seeds), batch_size))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                factor, tried, spent = future.result()
+                iterations, busy_time, batches = iterations + tried, busy_time + spent, batches + 1
+                if factor is not None:
+                    return AttackResult(factor, iterations, batches, time.perf_counter() - start, busy_time / iterations)
+    finally:
+        stop.set()
+        executor.shutdown(cancel_futures=True)
+
+
+# Generate count RSA keys (n, d, e) with a modulus of exactly the given number of bits, reproducibly
+# from the seed: every size has its own corpus, the same for any other size in the benchmark.
+# p has bits // 2 bits and q (distinct from p) the rest, both at least sqrt(2^(k - 1)) for a k-bit factor, so that
+# the product can't be one bit short
+def generate_key_corpus(bits, count, seed):
+    if bits < BENCHMARK_MIN_BITS:
+        raise ValueError("The moduli must have at least %d bits" % BENCHMARK_MIN_BITS)
+    random.seed("%d-%d" % (seed, bits))
+    keys = []
+    for i in range(count):
+        p = random_prime_of_product_size(bits // 2)
+        q = random_prime_of_product_size(bits - bits // 2)
+        while q == p:
+            q = random_prime_of_product_size(bits - bits // 2)
+        public_key, private_key = public_key_algorithms.generate_rsa_key(p, q, 0)
+        keys.append((public_key[1], private_key[0], public_key[0]))
+    return keys
+
+
+# Random prime in [isqrt(2^(2k - 1)) + 1, 2^k): the product of two such primes of k1 and k2 bits
+# has exactly k1 + k2 bits
+def random_prime_of_product_size(k):
+    return public_key_algorithms.generate_random_prime(math.isqrt(2 ** (2 * k - 1)) + 1, 2 ** k - 1, 16)
+
+
+# Percentile q (0-100) of the sorted values, with linear interpolation
+def percentile(values, q):
+    position = (len(values) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+# Summary statistics of a list of measures
+def summary(values):
+    values = sorted(values)
+    mean = sum(values) / len(values)
+    return {
+        'mean': mean,
+        'variance': sum((x - mean) ** 2 for x in values) / len(values),
+        'min': values[0],
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'max': values[-1],
+    }
+
+
+# Non-interactive benchmark of the decryption exponent attack: the key corpora of every size are
+# generated before any timing, warmup attacks are run and discarded, and every attack uses a
+# seeded sequence of bases, so the iteration counts are the same on every run with the same seed
+def benchmark(sizes, keys_per_size, warmup=BENCHMARK_WARMUP, seed=BENCHMARK_SEED, workers=1):
+    corpora = {bits: generate_key_corpus(bits, keys_per_size, seed) for bits in sizes}
+    results = []
+    for bits in sizes:
+        keys = corpora[bits]
+        for i in range(warmup):
+            n, d, e = keys[i % len(keys)]
+            decryptionexp_parallel(n, d, e, workers, seed=seed)
+
+        latencies, iterations = [], []
+        for i, (n, d, e) in enumerate(keys):
+            result = decryptionexp_parallel(n, d, e, workers, seed=seed + i)
+            latencies.append(result.elapsed)
+            iterations.append(result.iterations)
+        results.append({
+            'bits': bits,
+            'keys': len(keys),
+            'latency': summary(latencies),
+            'iterations': dict(summary(iterations),
+                               distribution={str(k): iterations.count(k) for k in sorted(set(iterations))}),
+        })
+    return {
+        'seed': seed,
+        'warmup': warmup,
+        'workers': workers,
+        'python': platform.python_version(),
+        'results': results,
+    }
 
 
 # Print the Main Menu
@@ -54,6 +242,23 @@ def menu():
 
 
 def main():
+    if len(sys.argv) > 1:
+        parser = argparse.ArgumentParser(description='Benchmark of the decryption exponent attack.')
+        parser.add_argument('sizes', type=int, nargs='+', help='sizes of the moduli (number of bits)')
+        parser.add_argument('-k', '--keys', type=int, default=BENCHMARK_KEYS, help='number of keys per size')
+        parser.add_argument('--warmup', type=int, default=BENCHMARK_WARMUP, help='number of warmup attacks')
+        parser.add_argument('-s', '--seed', type=int, default=BENCHMARK_SEED, help='seed of keys and bases')
+        parser.add_argument('-w', '--workers', type=int, default=1, help='number of worker processes per attack')
+        parser.add_argument('-o', '--output', help='JSON output file (default: standard output)')
+        args = parser.parse_args()
+        report = benchmark(args.sizes, args.keys, args.warmup, args.seed, args.workers)
+        if args.output is None:
+            print(json.dumps(report, indent=2))
+        else:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        return
+
     while True:
         # Ask the user what function wants to run
         choice = menu()
@@ -64,39 +269,30 @@ def main():
             n = get_input("\nInsert the modulo n: ")
             d = get_input("Insert the exponent d of the private key: ")
             e = get_input("Insert the exponent e of the public key: ")
-            factor, iteration = decryptionexp(n, d, e)
-            print("\nNon Trivial Factor of n:", factor)
-            print("Total Algorithm Iterations:", iteration, "\n")
+            result = decryptionexp_parallel(n, d, e)
+            print("\nNon Trivial Factor of n:", result.factor)
+            print("Total Algorithm Iterations:", result.iterations)
+            print("Execution Time:", result.elapsed, "seconds")
+            print("Average Time per Iteration:", result.iteration_time, "seconds\n")
 
         elif choice == 2:
             k = get_input("\nInsert the size of modules to be randomly generated (number of bits): ")
             iteration = get_input("Insert the total number of random modules to be tested: ")
-            # Begin the test
-            iteration_sum = 0
-            decryptionexp_exec_time = []
+            if k < BENCHMARK_MIN_BITS or iteration < 1:
+                print("\nThe moduli must have at least", BENCHMARK_MIN_BITS, "bits and at least one must be tested\n")
+                continue
             input("\nPress Enter to begin the test.\n")
             print("Test is Started.")
-            for i in range(iteration):
-                p_test, q_test, d_test = public_key_algorithms.generate_test_case(k)
-                public_key, private_key = public_key_algorithms.generate_rsa_key(p_test, q_test, d_test)
-
-                start = time.perf_counter()
-                _, alg_iterations = decryptionexp(public_key[1], private_key[0], public_key[0])
-                end = time.perf_counter()
-                decryptionexp_exec_time.append(end - start)
-
-                iteration_sum += alg_iterations
-                print("\rCurrently Tested Modules:", i + 1, end="", flush=True)
-
-            print("\nTest is completed.\n")
+            report = benchmark([k], iteration)['results'][0]
+            print("Test is completed.\n")
 
-            # Calculate and display average algorithm iterations, average execution time and time variance
-            avg_exec_time = sum(decryptionexp_exec_time) / iteration
-            var_exec_time = sum(map(lambda x: (x - avg_exec_time) ** 2, decryptionexp_exec_time)) / iteration
+            # Display average algorithm iterations and execution time statistics
             print("- Test Results -")
-            print("Average Algorithm Iterations:", iteration_sum / iteration)
-            print("Average Execution Time:", avg_exec_time, "seconds")
-            print("Variance of Execution Time:", var_exec_time, "seconds^2\n")
+            print("Average Algorithm Iterations:", report['iterations']['mean'])
+            print("Average Execution Time:", report['latency']['mean'], "seconds")
+            print("Variance of Execution Time:", report['latency']['variance'], "seconds^2")
+            print("Execution Time p50 / p90 / p99:", report['latency']['p50'], "/", report['latency']['p90'], "/",
+                  report['latency']['p99'], "seconds\n")
 
         elif choice == 3:
             exit(0)
@@ -0,0 +1,144 @@
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import public_key_algorithms
+
+# Number of pre-generated test cases (p, q, d) kept ready by a KeyPool
+KEY_POOL_SIZE = 32
+
+
+# Get input from the user
+def get_input(message):
+    return int(input(message))
+
+
+# Process pool initializer: forked workers would share the RNG state of the parent (and
+# generate the same keys), so every worker reseeds from the operating system entropy
+def seed_worker():
+    random.seed(os.urandom(32))
+
+
+# Generate a test case (p, q, d) of the given dimension, reseeding the RNG first if a seed is given
+def generate_seeded_test_case(dimension, seed=None):
+    if seed is not None:
+        random.seed(seed)
+    return public_key_algorithms.generate_test_case(dimension)
+
+
+# Generate a RSA public and private key pair (or a CRT one) from a test case
+def keypair_from_test_case(test_case, crt=False):
+    if crt:
+        return public_key_algorithms.generate_rsa_crt_key(*test_case)
+    return public_key_algorithms.generate_rsa_key(*test_case)
+
+
+# Generate count key pairs of the given dimension across a process pool. With a seed, the
+# i-th key pair is generated from seed + i, so the result doesn't depend on the workers
+def generate_rsa_keys(count, dimension, workers=None, seed=None, crt=False):
+    seeds = [None if seed is None else seed + i for i in range(count)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=seed_worker) as executor:
+        test_cases = executor.map(generate_seeded_test_case, [dimension] * count, seeds)
+        return [keypair_from_test_case(test_case, crt) for test_case in test_cases]
+
+
+class KeyPool:
+    # Pool of pre-generated test cases (p, q, d) of one dimension, refilled in background by a
+    # process pool: a key pair request only takes a ready test case and computes e, so it is
+    # served in constant time as long as the pool is not empty
+    __slots__ = ('dimension', 'seed', 'test_cases', 'executor', 'workers', 'stopped', 'filler', 'error')
+
+    def __init__(self, dimension, size=KEY_POOL_SIZE, workers=None, seed=None):
+        self.dimension = dimension
+        self.seed = seed
+        self.test_cases = queue.Queue(maxsize=size)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=seed_worker)
+        self.stopped = threading.Event()
+        self.error = None
+        self.filler = threading.Thread(target=self.fill, daemon=True)
+        self.filler.start()
+
+    def fill(self):
+        # Keep one generation running on every worker and move the results, in submission
+        # order, to the queue of the ready test cases. If a generation fails, the error is kept
+        # and a None sentinel is queued, so that the callers fail instead of waiting forever
+        pending = deque()
+        generated = 0
+        try:
+            while not self.stopped.is_set():
+                while len(pending) < self.workers:
+                    seed = None if self.seed is None else self.seed + generated + len(pending)
+                    pending.append(self.executor.submit(generate_seeded_test_case, self.dimension, seed))
+                test_case = pending.popleft().result()
+                generated += 1
+                self.put(test_case)
+        except BaseException as error:
+            self.error = error
+            self.put(None)
+
+    def put(self, test_case):
+        # Put into the queue, waiting for a free place unless the pool is closed
+        while not self.stopped.is_set():
+            try:
+                self.test_cases.put(test_case, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+
+    def check(self):
+        if self.error is not None:
+            raise RuntimeError("The key pool generation failed") from self.error
+
+    def size(self):
+        # Number of test cases ready
+        self.check()
+        return self.test_cases.qsize()
+
+    def get_keypair(self, crt=False, timeout=None):
+        self.check()
+        test_case = self.test_cases.get(timeout=timeout)
+        if test_case is None:
+            # Leave the sentinel for the other callers
+            self.test_cases.put(None)
+            self.check()
+        return keypair_from_test_case(test_case, crt)
+
+    def close(self):
+        self.stopped.set()
+        self.filler.join()
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    dimension = get_input("\nInsert the dimension of the primes (number of digits): ")
+    count = get_input("Insert the number of key pairs to generate: ")
+    workers = get_input("Insert the number of worker processes: ")
+
+    start = time.perf_counter()
+    keys = generate_rsa_keys(count, dimension, workers)
+    end = time.perf_counter()
+    print("\nGenerated", len(keys), "key pairs in", end - start, "seconds")
+
+    size = get_input("\nInsert the size of the background key pool: ")
+    with KeyPool(dimension, size, workers) as pool:
+        input("Press Enter to take %d key pairs from the pool.\n" % size)
+        start = time.perf_counter()
+        for i in range(size):
+            pool.get_keypair()
+        end = time.perf_counter()
+        print("Served", size, "key pairs in", end - start, "seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+from typing import NamedTuple
+
+
+# Number of leading bits of the operands used by the single precision steps of Lehmer's algorithm
+LEHMER_BITS = 60
+
+# Below this size the operands are small enough for the plain euclidean algorithm
+LEHMER_THRESHOLD = 1 << LEHMER_BITS
+
+
+# Result of the extended euclidean algorithm: gcd = a * x + b * y
+class ExtendedGcd(NamedTuple):
+    gcd: int
+    x: int
+    y: int
+
+
+# Compute the extended euclidean algorithm with Lehmer's method: the quotients are computed on the
+# leading LEHMER_BITS bits of the operands, as long as they are the same of the full numbers, and
+# collected in a 2x2 matrix applied to the full numbers at once, so a multi-thousand-bit gcd costs
+# a few matrix products per word instead of a long division per quotient.
+# The coefficients are the same of the plain euclidean algorithm, and all integers are exact
+def extended_gcd(a, b):
+    u, v = abs(a), abs(b)
+    swap = u <= v
+    if swap:
+        u, v = v, u
+
+    # Invariants: u = su * |a'| + ... where a' is the first operand after the swap, only the
+    # coefficients of the first operand are tracked and the second one is computed at the end
+    su, sv = 1, 0
+    while v >= LEHMER_THRESHOLD:
+        shift = u.bit_length() - LEHMER_BITS
+        x, y = u >> shift, v >> shift
+        m00, m01, m10, m11 = 1, 0, 0, 1
+        while y + m10 != 0 and y + m11 != 0:
+            q = (x + m00) // (y + m10)
+            if q != (x + m01) // (y + m11):
+                break
+            m00, m10 = m10, m00 - q * m10
+            m01, m11 = m11, m01 - q * m11
+            x, y = y, x - q * y
+        if m01 == 0:
+            # No quotient could be deduced from the leading bits: one full precision step
+            q, r = divmod(u, v)
+            u, v = v, r
+            su, sv = sv, su - q * sv
+        else:
+            u, v = m00 * u + m01 * v, m10 * u + m11 * v
+            su, sv = m00 * su + m01 * sv, m10 * su + m11 * sv
+    while v != 0:
+        q, r = divmod(u, v)
+        u, v = v, r
+        su, sv = sv, su - q * sv
+
+    first, second = (abs(b), abs(a)) if swap else (abs(a), abs(b))
+    x = su
+    y = (u - first * x) // second if second != 0 else 0
+    if swap:
+        x, y = y, x
+    if a < 0:
+        x = -x
+    if b < 0:
+        y = -y
+    return ExtendedGcd(u, x, y)
+
+
+# Compute the inverse of a modulo m, raises ValueError if a and m are not coprime
+def inverse(a, m):
+    gcd, x, _ = extended_gcd(a % m, m)
+    if gcd != 1:
+        raise ValueError("%d is not invertible modulo %d (gcd %d)" % (a, m, gcd))
+    return x % m
+
+
+# Compute the inverses modulo m of all the values with Montgomery's trick: the prefix products
+# a1, a1*a2, ..., a1*...*an are inverted with a single extended gcd, and every inverse is then
+# recovered walking back the prefixes, for a total of 1 inversion and 3(n - 1) multiplications.
+# Raises ValueError, naming the first one, if a value is not invertible
+def batch_inverse(values, m):
+    values = [a % m for a in values]
+    if not values:
+        return []
+    prefixes = [values[0]]
+    for a in values[1:]:
+        prefixes.append(prefixes[-1] * a % m)
+    try:
+        inv = inverse(prefixes[-1], m)
+    except ValueError:
+        for a in values:
+            inverse(a, m)
+        raise
+
+    inverses = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        inverses[i] = inv * prefixes[i - 1] % m
+        inv = inv * values[i] % m
+    inverses[0] = inv
+    return inverses
@@ -1,62 +1,215 @@
+import functools
+import itertools
 import math
+import os
 import random
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import modular_arithmetic
+
+
+# Reduction used by fast_exp_alg when none is given: 'plain' (python %), 'montgomery' or 'barrett'
+EXP_REDUCTION = 'plain'
+
+# Number of values sent to a worker at once by rsa_batch, and chunks in flight per worker
+BATCH_CHUNK_SIZE = 256
+BATCH_QUEUE_SIZE_PER_WORKER = 4
+
+
+# Compute the Fast modular exponentiation algorithm, with the left-to-right sliding window method:
+# the odd powers a, a^3, ..., a^(2^k - 1) are precomputed and every window of up to k bits of the
+# exponent costs its squarings plus a single multiplication
+def fast_exp_alg(a, n, m, reduction=None):
+    reduction = reduction or EXP_REDUCTION
+    if m == 1:
+        return 0
+    if reduction == 'montgomery' and m % 2 == 1:
+        m, bits, mask, m_prime, r2 = montgomery_context(m)
+
+        def mul(x, y):
+            t = x * y
+            t = (t + ((t & mask) * m_prime & mask) * m) >> bits
+            return t - m if t >= m else t
+
+        return mul(sliding_window_exp(mul(a % m, r2), n, mul, mul(1, r2)), 1)
+    if reduction == 'barrett':
+        m, bits, mu = barrett_context(m)
+
+        def mul(x, y):
+            t = x * y
+            t -= ((t >> (bits - 1)) * mu >> (bits + 1)) * m
+            while t >= m:
+                t -= m
+            return t
+
+        return sliding_window_exp(a % m, n, mul, 1)
+    return sliding_window_exp(a % m, n, lambda x, y: x * y % m, 1)
+
+
+def sliding_window_exp(a, n, mul, one):
+    # a^n with the product mul, one is the identity of mul
+    k = exp_window_size(n.bit_length())
+    a2 = mul(a, a)
+    odd_powers = [a]
+    for i in range(1, 1 << (k - 1)):
+        odd_powers.append(mul(odd_powers[-1], a2))
+
+    d = one
+    i = n.bit_length() - 1
+    while i >= 0:
+        if (n >> i) & 1 == 0:
+            d = mul(d, d)
+            i -= 1
+        else:
+            # longest window of at most k bits from bit i that ends with a 1
+            j = max(i - k + 1, 0)
+            while (n >> j) & 1 == 0:
+                j += 1
+            for _ in range(i - j + 1):
+                d = mul(d, d)
+            d = mul(d, odd_powers[((n >> j) & ((1 << (i - j + 1)) - 1)) >> 1])
+            i = j - 1
+    return d
 
 
-# Compute the Fast modular exponentiation algorithm
-def fast_exp_alg(a, n, m):
-    d, c = 1, 0
-    bin_n = "{0:b}".format(n)
-    for i in bin_n:
-        d = (d * d) % m
-        if int(i) == 1:
-            d = (d * a) % m
-    return d
+def exp_window_size(bits):
+    # Window size minimizing the multiplications for an exponent of the given number of bits
+    for k, limit in ((1, 8), (2, 24), (3, 80), (4, 240), (5, 672)):
+        if bits <= limit:
+            return k
+    return 6
+
+
+# Montgomery context of an odd modulus m: R = 2^bits > m, m_prime = -m^-1 mod R, r2 = R^2 mod m
+@functools.lru_cache(maxsize=64)
+def montgomery_context(m):
+    bits = m.bit_length()
+    r = 1 << bits
+    return m, bits, r - 1, (-pow(m, -1, r)) % r, (r * r) % m
+
+
+# Barrett context of the modulus m: mu = 4^bits // m
+@functools.lru_cache(maxsize=64)
+def barrett_context(m):
+    bits = m.bit_length()
+    return m, bits, (1 << (2 * bits)) // m
+
+
+# Time fast_exp_alg with every reduction against the built-in pow on random bits-bit operands
+def exp_benchmark(bits, samples):
+    operands = [(random.getrandbits(bits), random.getrandbits(bits), random.getrandbits(bits) | (1 << (bits - 1)) | 1)
+                for _ in range(samples)]
+    methods = [('pow', pow),
+               ('fast_exp_alg', lambda a, n, m: fast_exp_alg(a, n, m, 'plain')),
+               ('fast_exp_alg montgomery', lambda a, n, m: fast_exp_alg(a, n, m, 'montgomery')),
+               ('fast_exp_alg barrett', lambda a, n, m: fast_exp_alg(a, n, m, 'barrett'))]
+    times = {}
+    for name, method in methods:
+        start = time.perf_counter()
+        results = [method(a, n, m) for a, n, m in operands]
+        times[name] = time.perf_counter() - start
+        if results != [pow(a, n, m) for a, n, m in operands]:
+            raise ArithmeticError(name + " gives a wrong result")
+    return times
 
 
 # Compute the extended euclidean algorithm, returns the GCD and the inverse of a mod b
+# (None if a is not invertible, the Bezout coefficient of a if b is 0)
 def extended_euclidean_algorithm(a, b):
-    rm = b
-    rm1 = a
-    qm1 = 1
-    t = 0
-    while rm1 != 0:
-        q = math.floor(rm / rm1)
-        temp = t
-        t = qm1
-        qm1 = temp - q * qm1
-        temp = rm
-        rm = rm1
-        rm1 = temp - q * rm1
-    if t < 0:
-        t = t + b
-    if rm > 1:
-        t = "ND"
-    return rm, t
-
-
-# Compute the Miller-Rabin for a number given the number of rounds, return True if the number is composite
-def rabin_test(x, n):
-    m, r, xr = n - 1, 0, []
-    while m % 2 == 0:
-        m = m // 2
-        r = r + 1
-    xr.append(fast_exp_alg(x, m, n))
-    for i in range(1, r + 1):
-        xr.append(fast_exp_alg(xr[i - 1], 2, n))
-    return (xr[0] != 1) and all(xi % n != n - 1 for xi in xr[0:-1])
-
-
-# Generate a random k-bit prime number
+    gcd, x, _ = modular_arithmetic.extended_gcd(a, b)
+    if gcd != 1:
+        return gcd, None
+    return gcd, x % b if b != 0 else x
+
+
+# Compute the Miller-Rabin for a number given the base x, return True if the number is composite.
+# decomposition is the pair (r, m) with n - 1 = 2^r * m, m odd, computed once for all the bases
+def rabin_test(x, n, decomposition=None):
+    r, m = decomposition or number_decomposition(n - 1)
+    v = fast_exp_alg(x, m, n)
+    if v == 1 or v == n - 1:
+        return False
+    for i in range(1, r):
+        v = v * v % n
+        if v == n - 1:
+            return False
+        if v == 1:
+            return True
+    return True
+
+
+# Decompose n as 2^r * m with m odd, returns (r, m)
+def number_decomposition(n):
+    r = (n & -n).bit_length() - 1
+    return r, n >> r
+
+
+# Primes below SMALL_PRIMES_LIMIT, used to sieve the candidates before the Miller-Rabin test
+SMALL_PRIMES_LIMIT = 2000
+SMALL_PRIMES = [p for p in range(2, SMALL_PRIMES_LIMIT) if all(p % q != 0 for q in range(2, math.isqrt(p) + 1))]
+
+# Number of odd candidates sieved at a time by generate_random_prime
+SIEVE_INTERVAL = 4096
+
+
+# Return True if n is a probable prime: trial division by the small primes, then accuracy
+# rounds of Miller-Rabin with random bases, stopping at the first witness
+def is_probable_prime(n, accuracy, trial_division=True):
+    if n < 2:
+        return False
+    if trial_division:
+        for p in SMALL_PRIMES:
+            if n % p == 0:
+                return n == p
+    if n < SMALL_PRIMES_LIMIT ** 2:
+        return True
+    decomposition = number_decomposition(n - 1)
+    return not any(rabin_test(random.randint(2, n - 2), n, decomposition) for i in range(accuracy))
+
+
+# Sieve count odd numbers from start (odd): the i-th flag is 0 if start + 2i has a small
+# prime factor (and is not that prime)
+def sieve_interval(start, count):
+    flags = bytearray([1]) * count
+    for p in SMALL_PRIMES[1:]:
+        i = (-start * ((p + 1) // 2)) % p  # start + 2i = 0 mod p, (p + 1) // 2 is the inverse of 2
+        if start + 2 * i == p:
+            i += p
+        if i < count:
+            flags[i::p] = bytes(len(range(i, count, p)))
+    return flags
+
+
+# Generate a random prime number between minimum and limit: the search starts from a random
+# odd number and moves forward (wrapping around) sieving SIEVE_INTERVAL candidates at a time,
+# only the candidates without small factors get the Miller-Rabin test
 def generate_random_prime(minimum, limit, accuracy):
-    random_number = 0
-    condition = True
-    while condition:
-        random_number = random.randint(minimum, limit)
-        if random_number % 2 != 0:
-            test_sample = [random.randint(2, limit) for i in range(0, accuracy)]
-            condition = any(rabin_test(x, random_number) for x in test_sample)
-    return random_number
+    low = max(minimum, 3) | 1
+    high = limit if limit % 2 == 1 else limit - 1
+    if low > high:
+        raise ValueError("There are no odd numbers between %d and %d" % (minimum, limit))
+    start = low + 2 * random.randint(0, (high - low) // 2)
+
+    candidate, wrapped = start, False
+    while True:
+        count = (high - candidate) // 2 + 1
+        if wrapped:
+            count = min(count, (start - candidate) // 2)
+        count = min(count, SIEVE_INTERVAL)
+        flags = sieve_interval(candidate, count)
+        i = flags.find(1)
+        while i != -1:
+            if is_probable_prime(candidate + 2 * i, accuracy, trial_division=False):
+                return candidate + 2 * i
+            i = flags.find(1, i + 1)
+        candidate += 2 * count
+        if wrapped and candidate >= start:
+            raise ValueError("There are no primes between %d and %d" % (minimum, limit))
+        if candidate > high:
+            candidate, wrapped = low, True
 
 
 # RSA encryption
@@ -69,41 +222,70 @@ def rsa_decrypt(c, km):
     return fast_exp_alg(c, km[0], km[1])
 
 
+# Generates a random prime private exponent d < n coprime with phi: a prime is coprime with phi
+# unless it divides it, so a single modulo replaces the extended euclidean algorithm, and a new
+# prime is drawn only in that (rare) case
+def generate_private_exponent(n, phi, accuracy):
+    d = generate_random_prime(2, n - 1, accuracy)
+    while phi % d == 0:
+        d = generate_random_prime(2, n - 1, accuracy)
+    return d
+
+
 # Generates a RSA public and private key pair
 def generate_rsa_key(p, q, d):
     n = p * q
     phi = (p - 1) * (q - 1)
     if d == 0:
-        d = generate_random_prime(2, n - 1, 5)
-        while extended_euclidean_algorithm(d, phi)[0] != 1:
-            d = generate_random_prime(2, n - 1, 16)
-    e = extended_euclidean_algorithm(d, phi)
-    kp = (e[1], n)
+        d = generate_private_exponent(n, phi, 16)
+    kp = (modular_arithmetic.inverse(d, phi), n)
     km = (d, n)
     return kp, km
 
 
+# Private key for the RSA decryption with CRT: the exponents d mod (p - 1) and d mod (q - 1),
+# q^-1 mod p for the Garner recombination and the modulo n are computed once with the key.
+# The first three fields are the same of the tuple (p, q, d, ...) used before
+class CrtKey(NamedTuple):
+    p: int
+    q: int
+    d: int
+    dp: int
+    dq: int
+    qinv: int
+    n: int
+
+
+# Build the CRT private key of p, q and d
+def crt_key(p, q, d):
+    return CrtKey(p, q, d, d % (p - 1), d % (q - 1), modular_arithmetic.inverse(q, p), p * q)
+
+
+# The CRT private key of km, converting a tuple (p, q, d, ...): nothing is kept, so a tuple is
+# converted again on every call and repeated decryptions should use the CrtKey of generate_rsa_crt_key
+def as_crt_key(km):
+    return km if isinstance(km, CrtKey) else crt_key(km[0], km[1], km[2])
+
+
 # Generates a RSA public and private key pair with CRT
 def generate_rsa_crt_key(p, q, d):
     n = p * q
     phi = (p - 1) * (q - 1)
     if d == 0:
-        d = generate_random_prime(2, n - 1, 5)
-        while d != 1 and extended_euclidean_algorithm(d, phi)[0] != 1:
-            d = generate_random_prime(2, n - 1, 5)
-    q_inv = extended_euclidean_algorithm(q, p)[1]
-    p_inv = extended_euclidean_algorithm(p, q)[1]
-    e = extended_euclidean_algorithm(d, phi)
-    kp = (e[1], n)
-    km = (p, q, d, p_inv * p, q_inv * q)
+        d = generate_private_exponent(n, phi, 16)
+    kp = (modular_arithmetic.inverse(d, phi), n)
+    km = crt_key(p, q, d)
     return kp, km
 
 
-# RSA decryption with CRT
+# RSA decryption with CRT: the two half-size exponentiations use the reduced exponents dp and dq,
+# and the Garner recombination m = mq + q * (qinv * (mp - mq) mod p) only works with numbers of
+# the size of p. km can also be a tuple (p, q, d, ...), see as_crt_key
 def rsa_decrypt_crt(c, km):
-    mp = fast_exp_alg(c, km[2], km[0])
-    mq = fast_exp_alg(c, km[2], km[1])
-    return ((mp * km[4]) + (mq * km[3])) % (km[0] * km[1])
+    km = as_crt_key(km)
+    mp = fast_exp_alg(c % km.p, km.dp, km.p)
+    mq = fast_exp_alg(c % km.q, km.dq, km.q)
+    return mq + km.q * (km.qinv * (mp - mq) % km.p)
 
 
 def generate_test_case(dimension):
@@ -111,20 +293,101 @@ def generate_test_case(dimension):
     big_q_test = generate_random_prime(10 ** dimension, (10 ** (dimension + 1)) - 1, 16)
     big_phi_test = (big_p_test - 1) * (big_q_test - 1)
     big_n_test = big_p_test * big_q_test
-    big_d_test = generate_random_prime(2, big_n_test - 1, 16)
-    while big_d_test != 1 and extended_euclidean_algorithm(big_d_test, big_phi_test)[0] != 1:
-        big_d_test = generate_random_prime(2, big_n_test - 1, 16)
+    big_d_test = generate_private_exponent(big_n_test, big_phi_test, 16)
     return big_p_test, big_q_test, big_d_test
 
 
-def decrypting_test(cypher_text, keys):
-    for c in cypher_text:
-        rsa_decrypt(c, keys)
+# Batch operations of rsa_batch
+BATCH_OPERATIONS = {
+    'encrypt': rsa_encrypt,
+    'decrypt': rsa_decrypt,
+    'decrypt_crt': rsa_decrypt_crt,
+}
 
+# Operation and key of a batch worker, set once by init_batch_worker
+batch_operation = None
+batch_key = None
 
-def decrypting_test_crt(cypher_text, keys):
-    for c in cypher_text:
-        rsa_decrypt_crt(c, keys)
+
+# Prepare the key of a batch operation once: the CRT private key is converted and the
+# Montgomery context of the modulo (if used) is computed before the first value
+def prepare_batch_key(operation, key):
+    if operation == 'decrypt_crt':
+        key = as_crt_key(key)
+        moduli = (key.p, key.q)
+    else:
+        moduli = (key[1],)
+    if EXP_REDUCTION == 'montgomery':
+        for m in moduli:
+            if m % 2 == 1:
+                montgomery_context(m)
+    elif EXP_REDUCTION == 'barrett':
+        for m in moduli:
+            barrett_context(m)
+    return key
+
+
+# Process pool initializer: the key is sent and prepared once for every worker, not with every chunk
+def init_batch_worker(operation, key, reduction):
+    global batch_operation, batch_key, EXP_REDUCTION
+    EXP_REDUCTION = reduction
+    batch_operation = BATCH_OPERATIONS[operation]
+    batch_key = prepare_batch_key(operation, key)
+
+
+def batch_chunk(values):
+    return [batch_operation(v, batch_key) for v in values]
+
+
+# Apply an RSA operation ('encrypt', 'decrypt' or 'decrypt_crt') with one key to a sequence or
+# iterator of values, yielding the results in order. The values are sent in chunks to a pool of
+# workers processes, with at most BATCH_QUEUE_SIZE_PER_WORKER chunks per worker in flight, so an
+# arbitrarily long stream is processed in bounded memory. With one worker, it runs in this process
+def rsa_batch(values, key, operation, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    function = BATCH_OPERATIONS[operation]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        key = prepare_batch_key(operation, key)
+        for v in values:
+            yield function(v, key)
+        return
+
+    values = iter(values)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                             initargs=(operation, key, EXP_REDUCTION)) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < workers * BATCH_QUEUE_SIZE_PER_WORKER:
+                chunk = list(itertools.islice(values, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(batch_chunk, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+# RSA encryption of a batch of messages with the public key kp
+def rsa_encrypt_batch(messages, kp, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    return rsa_batch(messages, kp, 'encrypt', workers, chunk_size)
+
+
+# RSA decryption of a batch of ciphertexts with the private key km
+def rsa_decrypt_batch(cypher_text, km, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    return rsa_batch(cypher_text, km, 'decrypt', workers, chunk_size)
+
+
+# RSA decryption with CRT of a batch of ciphertexts with the private key km
+def rsa_decrypt_crt_batch(cypher_text, km, workers=None, chunk_size=BATCH_CHUNK_SIZE):
+    return rsa_batch(cypher_text, km, 'decrypt_crt', workers, chunk_size)
+
+
+def decrypting_test(cypher_text, keys, workers=1):
+    return list(rsa_decrypt_batch(cypher_text, keys, workers))
+
+
+def decrypting_test_crt(cypher_text, keys, workers=1):
+    return list(rsa_decrypt_crt_batch(cypher_text, keys, workers))
 
 
 # Print the Main Menu
@@ -139,16 +402,17 @@ def menu():
     print("7) RSA Decryption.")
     print("8) Test RSA Decryption with CRT.")
     print("9) Generate test case.")
-    print("10) Quit.\n")
+    print("10) Benchmark Fast Modular Exponentiation.")
+    print("11) Quit.\n")
 
     try:
         choice = int(input("Select a function to run: "))
-        if 1 <= choice <= 9:
+        if 1 <= choice <= 11:
             return choice
         else:
-            print("\nYou must enter a number from 1 to 9\n")
+            print("\nYou must enter a number from 1 to 11\n")
     except ValueError:
-        print("\nYou must enter a number from 1 to 9\n")
+        print("\nYou must enter a number from 1 to 11\n")
     input("Press Enter to continue.\n")
 
 
@@ -169,7 +433,7 @@ def main():
                 b = get_input("Insert the second integer: ")
                 gcd, inv = extended_euclidean_algorithm(a, b)
                 print("\nGreatest Common Divisor (GCD):", gcd)
-                print("inv: ", inv, "\n")
+                print("inv: ", "ND" if inv is None else inv, "\n")
 
             elif choice == 2:
                 a = get_input("\nInsert the base: ")
@@ -180,7 +444,7 @@ def main():
             elif choice == 3:
                 n = get_input("\nInsert an integer: ")
                 rounds = get_input("Insert the number of rounds to execute (default=40): ")
-                print("\nTest Miller-Rabin:", rabin_test(n, rounds), "\n")
+                print("\nTest Miller-Rabin:", not is_probable_prime(n, rounds), "\n")
 
             elif choice == 4:
                 k = get_input("\nInsert number of bits (k>1): ")
@@ -262,8 +526,15 @@ def main():
 
                     print("\n- Speedup:", ((decryption_exec_time / crt_decryption_exec_time) - 1) * 100, "seconds\n")
 
-                elif choice == 10:
-                    exit(0)
+            elif choice == 10:
+                k = get_input("\nInsert the number of bits of the operands: ")
+                samples = get_input("Insert the number of exponentiations: ")
+                for name, exec_time in exp_benchmark(k, samples).items():
+                    print(name + ":", exec_time, "seconds")
+                print()
+
+            elif choice == 11:
+                exit(0)
 
         except ValueError:
             print("\nYou must enter an integer\n")
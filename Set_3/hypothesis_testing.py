@@ -1,5 +1,7 @@
+import importlib.util
 import numpy as np
 import os
+import sys
 
 random_character_distribution = dict.fromkeys(list(map(chr, range(97, 123))), 1 / 26)
 english_character_distribution = {'a': 0.08167, 'b': 0.01492, 'c': 0.02782, 'd': 0.04253, 'e': 0.12702, 'f': 0.02228,
@@ -8,6 +10,22 @@ english_character_distribution = {'a': 0.08167, 'b': 0.01492, 'c': 0.02782, 'd':
                                   's': 0.06327, 't': 0.09056, 'u': 0.02758, 'v': 0.00978, 'w': 0.02360, 'x': 0.00150,
                                   'y': 0.01974, 'z': 0.00074}
 
+# text_frequency of Set_1 reads the frequency tables, it is loaded from its file only when a table is used
+TEXT_FREQUENCY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Set_1', 'text_frequency.py')
+
+
+def load_text_frequency():
+    spec = importlib.util.spec_from_file_location('text_frequency', TEXT_FREQUENCY_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def reference_character_distribution(table_path):
+    # Letter distribution of a text_frequency table, with lowercase keys
+    text_frequency = load_text_frequency()
+    return {letter.lower(): p for letter, p in text_frequency.reference_distribution(table_path).items()}
+
 
 def count_character(text):
     occurrences = dict()
@@ -55,6 +73,10 @@ def hypothesis_testing(text):
 
 
 if __name__ == '__main__':
+    # An optional argument is the frequency table of the reference distribution
+    if len(sys.argv) > 1:
+        english_character_distribution = reference_character_distribution(sys.argv[1])
+
     results = []
     for file in os.listdir("ExerciseText/"):
         if file.endswith(".txt"):